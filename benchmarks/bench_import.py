@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Import time benchmark
+The service starts at every login, so `import ollama_presence` has to stay
+cheap. This runs a fresh interpreter --runs times and reports the median
+wall-clock cost of the import on top of bare interpreter startup, the
+module's own cumulative time from `-X importtime`, and which heavy
+dependencies (psutil, pypresence, asyncio, ...) were imported eagerly.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --check    # fail on budget.json regressions
+
+The bytecode cache is written up front, as it would be after the first login.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import py_compile
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "budget.json"
+
+# Only needed once the matching backend runs, none of them should be loaded by the import itself
+LAZY_MODULES = ["psutil", "pypresence", "asyncio", "subprocess", "concurrent.futures", "http.client", "http.server", "ctypes"]
+
+def run_python(code, *flags):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return time.perf_counter() - start, result
+
+def import_time_us(stderr):
+    """Cumulative microseconds -X importtime reports for ollama_presence."""
+    for line in stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == "ollama_presence":
+            return int(parts[1])
+    return None
+
+def run_benchmark(args):
+    # Every measured run loads bytecode like a real login would, even with PYTHONDONTWRITEBYTECODE set
+    py_compile.compile(str(ROOT / "ollama_presence.py"), doraise=True)
+
+    baseline = [run_python("pass")[0] for _ in range(args.runs)]
+    with_import = [run_python("import ollama_presence")[0] for _ in range(args.runs)]
+    cumulative = [import_time_us(run_python("import ollama_presence", "-X", "importtime")[1].stderr) for _ in range(args.runs)]
+
+    check = f"import sys, json, ollama_presence; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    eager = json.loads(run_python(check)[1].stdout)
+
+    return {
+        "scenario": "import",
+        "runs": args.runs,
+        "interpreter_ms": round(statistics.median(baseline) * 1000, 3),
+        "wall_ms": round((statistics.median(with_import) - statistics.median(baseline)) * 1000, 3),
+        "import_ms": round(statistics.median(cumulative) / 1000, 3),
+        "eager_modules": eager,
+        "eager_count": len(eager)
+    }
+
+def check_budget(result, budget_file):
+    """Compare against the "import" limits in budget.json, returns the list of violations."""
+    with open(budget_file, "r", encoding="utf-8") as f:
+        budget = json.load(f).get(result["scenario"], {})
+    failures = []
+    for metric, limit in budget.items():
+        value = result.get(metric)
+        if value is not None and value > limit:
+            failures.append(f"{metric} = {value} exceeds budget {limit}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark `import ollama_presence`")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--check", action="store_true", help=f"exit 1 if {BUDGET_FILE.name} is exceeded")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Import ({result['runs']} runs)")
+        print(f"  interpreter startup: {result['interpreter_ms']} ms")
+        print(f"  import (wall):       {result['wall_ms']} ms")
+        print(f"  import (importtime): {result['import_ms']} ms")
+        print(f"  eager heavy modules: {', '.join(result['eager_modules']) or 'none'}")
+
+    if args.check:
+        failures = check_budget(result, BUDGET_FILE)
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
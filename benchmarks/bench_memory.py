@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Resident memory benchmark
+The service stays resident for the whole session, so its footprint is held
+to a budget. This starts ollama_presence.py as its own process against the
+fake Ollama API and Discord IPC servers (tools/), samples its RSS once a
+second for --duration seconds and reports the steady state (median of the
+second half) and the peak, in the default configuration and in leanMode.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --check    # fail on budget.json regressions
+
+Requires the service dependencies (psutil, pypresence).
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+import psutil
+
+ROOT = Path(__file__).resolve().parent.parent
+TOOLS = ROOT / "tools"
+BUDGET_FILE = Path(__file__).resolve().parent / "budget.json"
+
+sys.path.insert(0, str(TOOLS))
+
+from fake_ollama_server import FakeOllamaServer, make_model
+from fake_discord_ipc import FakeDiscordIpcServer
+
+def run_service(args, lean):
+    workdir = Path(tempfile.mkdtemp(prefix="ollama-presence-memory-"))
+    server = FakeOllamaServer([make_model(name) for name in args.models.split(",") if name]).start()
+    discord = None
+    proc = None
+    try:
+        env = dict(os.environ, HOME=str(workdir / "home"), USERPROFILE=str(workdir / "home"), XDG_RUNTIME_DIR=str(workdir / "run"))
+        (workdir / "run").mkdir()
+        if os.name != "nt":
+            discord = FakeDiscordIpcServer(workdir / "run").start()
+        config = {
+            "ollamaHost": f"127.0.0.1:{server.port}",
+            "ollamaLog": "",
+            "gpuTelemetry": False,
+            "autoExit": False,
+            "pollIntervalMin": 1,
+            "pollIntervalMax": 1,
+            "leanMode": lean
+        }
+        (workdir / "config.json").write_text(json.dumps(config), encoding="utf-8")
+        shutil.copyfile(ROOT / "ollama_presence.py", workdir / "ollama_presence.py")
+
+        proc = subprocess.Popen([sys.executable, "ollama_presence.py"], cwd=workdir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        watched = psutil.Process(proc.pid)
+        samples = []
+        for _ in range(args.duration):
+            time.sleep(1)
+            if proc.poll() is not None:
+                raise RuntimeError(f"service exited with {proc.returncode}")
+            samples.append(watched.memory_info().rss)
+
+        steady = samples[len(samples) // 2:]
+        return {
+            "scenario": "memory_lean" if lean else "memory",
+            "duration_s": args.duration,
+            "rss_mb": round(statistics.median(steady) / 1024 / 1024, 1),
+            "peak_rss_mb": round(max(samples) / 1024 / 1024, 1)
+        }
+    finally:
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        server.stop()
+        if discord:
+            discord.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def check_budget(result, budget_file):
+    """Compare against the per-scenario limits in budget.json, returns the list of violations."""
+    with open(budget_file, "r", encoding="utf-8") as f:
+        budget = json.load(f).get(result["scenario"], {})
+    failures = []
+    for metric, limit in budget.items():
+        value = result.get(metric)
+        if value is not None and value > limit:
+            failures.append(f"{result['scenario']}: {metric} = {value} exceeds budget {limit}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the resident memory of the running service")
+    parser.add_argument("--duration", type=int, default=20, help="seconds to sample RSS for")
+    parser.add_argument("--models", default="llama3:8b,qwen2:7b")
+    parser.add_argument("--mode", choices=["default", "lean", "both"], default="both")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--check", action="store_true", help=f"exit 1 if {BUDGET_FILE.name} is exceeded")
+    args = parser.parse_args()
+
+    modes = {"default": [False], "lean": [True], "both": [False, True]}[args.mode]
+    results = [run_service(args, lean) for lean in modes]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{'Lean mode' if result['scenario'] == 'memory_lean' else 'Default'} ({result['duration_s']} s)")
+            print(f"  steady RSS: {result['rss_mb']} MB")
+            print(f"  peak RSS:   {result['peak_rss_mb']} MB")
+
+    if args.check:
+        failures = [failure for result in results for failure in check_budget(result, BUDGET_FILE)]
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Poll cycle benchmark
+Runs OllamaDiscordService.main_loop against stand-ins and reports what one
+tick costs: wall-clock latency (p50/p99, with the first tick reported on its
+own), CPU time, subprocess spawns per minute of simulated service time and RSS.
+
+Stand-ins: fake `ollama` and `nvidia-smi` executables on PATH (tools/),
+the fake Ollama API server, the fake Discord IPC server (a mock Presence on
+Windows) and a synthetic process table of --processes entries. HOME points at a scratch directory so logs
+and caches never touch the real ~/.ollama.
+
+    python benchmarks/bench_poll.py                      # API scenario
+    python benchmarks/bench_poll.py --scenario cli       # API down, CLI fallback
+    python benchmarks/bench_poll.py --check              # fail on budget.json regressions
+
+Requires the service dependencies (psutil, pypresence).
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+import importlib.util
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TOOLS = ROOT / "tools"
+BUDGET_FILE = Path(__file__).resolve().parent / "budget.json"
+
+sys.path.insert(0, str(TOOLS))
+
+from fake_ollama_server import FakeOllamaServer, make_model
+from fake_discord_ipc import FakeDiscordIpcServer
+
+class MockPresence:
+    """Records rpc calls instead of talking to Discord, for platforms without Unix sockets."""
+
+    def __init__(self, client_id=None, **kwargs):
+        self.client_id = client_id
+        self.updates = 0
+        self.clears = 0
+        self.last = None
+
+    def connect(self):
+        pass
+
+    def update(self, **payload):
+        self.updates += 1
+        self.last = payload
+
+    def clear(self, *args, **kwargs):
+        self.clears += 1
+
+    def close(self):
+        pass
+
+class FakeProcess:
+    """Just enough of psutil.Process for the liveness tracker."""
+
+    def __init__(self, pid, name, exe):
+        self.pid = pid
+        self.info = {"pid": pid, "name": name, "exe": exe}
+
+    def is_running(self):
+        return True
+
+    def status(self):
+        return "running"
+
+def synthetic_process_table(size):
+    """size processes, Ollama last so a scan has to walk all of them."""
+    table = [FakeProcess(1000 + i, f"worker-{i}", f"/usr/bin/worker-{i}") for i in range(size - 1)]
+    table.append(FakeProcess(999999, "ollama", "/usr/local/bin/ollama"))
+    return table
+
+class SpawnCounter:
+    """Counts every subprocess.Popen the service makes (subprocess.run goes through it too)."""
+
+    def __init__(self):
+        self.count = 0
+        self.original = subprocess.Popen
+
+    def __enter__(self):
+        counter = self
+
+        class CountingPopen(self.original):
+            def __init__(self, *args, **kwargs):
+                counter.count += 1
+                super().__init__(*args, **kwargs)
+
+        subprocess.Popen = CountingPopen
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen = self.original
+
+def make_shim(bin_dir, name, script):
+    """Put an executable called name on PATH that runs one of the tools/ scripts."""
+    if os.name == "nt":
+        path = bin_dir / f"{name}.cmd"
+        path.write_text(f'@"{sys.executable}" "{script}" %*\r\n', encoding="utf-8")
+    else:
+        path = bin_dir / name
+        path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n', encoding="utf-8")
+        path.chmod(0o755)
+
+def prepare_environment(workdir, models):
+    bin_dir = workdir / "bin"
+    bin_dir.mkdir()
+    make_shim(bin_dir, "ollama", TOOLS / "fake_ollama_cli.py")
+    make_shim(bin_dir, "nvidia-smi", TOOLS / "fake_nvidia_smi.py")
+    os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_OLLAMA_MODELS"] = ",".join(models)
+    home = workdir / "home"
+    home.mkdir()
+    os.environ["HOME"] = str(home)
+    os.environ["USERPROFILE"] = str(home)
+    runtime = workdir / "run"
+    runtime.mkdir()
+    os.environ["XDG_RUNTIME_DIR"] = str(runtime)
+    return runtime
+
+def load_service_module(workdir):
+    """Copy ollama_presence.py next to the scratch config.json, like the installer lays it out, and import it."""
+    shutil.copyfile(ROOT / "ollama_presence.py", workdir / "ollama_presence.py")
+    spec = importlib.util.spec_from_file_location("ollama_presence", workdir / "ollama_presence.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_benchmark(args):
+    models = [m for m in args.models.split(",") if m]
+    workdir = Path(tempfile.mkdtemp(prefix="ollama-presence-bench-"))
+    server = None
+    discord = None
+    try:
+        runtime = prepare_environment(workdir, models)
+        if os.name != "nt":
+            discord = FakeDiscordIpcServer(runtime).start()
+
+        if args.scenario == "api":
+            server = FakeOllamaServer([make_model(name) for name in models]).start()
+            ollama_host = f"127.0.0.1:{server.port}"
+        else:
+            # Nothing listens here, every model lookup falls back to the CLI
+            ollama_host = "127.0.0.1:9"
+
+        config = {
+            "ollamaHost": ollama_host,
+            "hardwareCacheTtl": 0 if args.cold else 86400,
+            "gpuTelemetry": not args.no_telemetry,
+            "autoExit": False
+        }
+        (workdir / "config.json").write_text(json.dumps(config), encoding="utf-8")
+
+        module = load_service_module(workdir)
+        if discord is None:
+            module.pypresence.Presence = MockPresence
+        table = synthetic_process_table(args.processes)
+        module.psutil.process_iter = lambda *a, **k: iter(table)
+
+        with SpawnCounter() as spawns:
+            service = module.OllamaDiscordService()
+
+            # The first tick does the one-off work (Discord handshake, hardware probe, telemetry start), report it on its own
+            first_start = time.perf_counter()
+            service.main_loop()
+            first_tick = time.perf_counter() - first_start
+            simulated = service.next_sleep()
+
+            latencies = []
+            cpu_times = []
+            for _ in range(args.ticks):
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                service.main_loop()
+                cpu_times.append(time.process_time() - cpu_start)
+                latencies.append(time.perf_counter() - wall_start)
+                # Time the real loop would have slept after this tick
+                simulated += service.next_sleep()
+
+            rpc_updates = len(discord.activities) if discord else service.rpc.updates
+            service.discord.close()
+            service.stop_telemetry()
+            service.api.close()
+            spawn_count = spawns.count
+
+        import psutil
+        rss = psutil.Process().memory_info().rss
+
+        return {
+            "scenario": args.scenario,
+            "ticks": args.ticks,
+            "processes": args.processes,
+            "first_tick_ms": round(first_tick * 1000, 3),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "cpu_ms_per_tick": round(sum(cpu_times) / len(cpu_times) * 1000, 3),
+            "spawns": spawn_count,
+            "spawns_per_min": round(spawn_count / (simulated / 60), 3) if simulated else None,
+            "rss_mb": round(rss / 1024 / 1024, 1),
+            "rpc_updates": rpc_updates
+        }
+    finally:
+        if server:
+            server.stop()
+        if discord:
+            discord.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def check_budget(result, budget_file):
+    """Compare against the per-scenario limits in budget.json, returns the list of violations."""
+    with open(budget_file, "r", encoding="utf-8") as f:
+        budget = json.load(f).get(result["scenario"], {})
+    failures = []
+    for metric, limit in budget.items():
+        value = result.get(metric)
+        if value is not None and value > limit:
+            failures.append(f"{metric} = {value} exceeds budget {limit}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark one OllamaDiscordService poll cycle")
+    parser.add_argument("--scenario", choices=["api", "cli"], default="api")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=2000, help="size of the synthetic process table")
+    parser.add_argument("--models", default="llama3:8b,qwen2:7b")
+    parser.add_argument("--cold", action="store_true", help="disable the hardware cache")
+    parser.add_argument("--no-telemetry", action="store_true", help="disable GPU telemetry")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--check", action="store_true", help=f"exit 1 if {BUDGET_FILE.name} is exceeded")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Scenario: {result['scenario']} ({result['ticks']} ticks, {result['processes']} processes)")
+        print(f"  first tick:       {result['first_tick_ms']} ms")
+        print(f"  tick latency p50: {result['p50_ms']} ms")
+        print(f"  tick latency p99: {result['p99_ms']} ms")
+        print(f"  CPU per tick:     {result['cpu_ms_per_tick']} ms")
+        print(f"  spawns/minute:    {result['spawns_per_min']} ({result['spawns']} total)")
+        print(f"  RSS:              {result['rss_mb']} MB")
+        print(f"  rpc.update calls: {result['rpc_updates']}")
+
+    if args.check:
+        failures = check_budget(result, BUDGET_FILE)
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4082 @@
+#!/usr/bin/env python3
+"""
+Ollama Discord Rich Presence
+Shows the models Ollama has loaded, with RAM/VRAM and GPU details, as your
+Discord status.
+
+    python ollama_presence.py [--async] [--debug] [--profile]
+    python ollama_presence.py --status | --stop | --reload | ...
+
+Installed with pip, the same is available as the `ollama-presence` command.
+"""
+
+import json
+import os
+import re
+import time
+import threading
+import signal
+import sys
+import logging
+import logging.handlers
+import importlib
+import queue
+import atexit
+import gc
+import socket
+import select
+import struct
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+class LazyImport:
+    """Stands in for a module and imports it on first attribute access.
+
+    The service starts at every login; most runs never touch the async, metrics
+    or CLI fallback code, so their imports (asyncio alone is ~30 ms) are only
+    paid for when that code runs.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only reached for names not set on the proxy itself
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+psutil = LazyImport('psutil')
+pypresence = LazyImport('pypresence')
+asyncio = LazyImport('asyncio')
+subprocess = LazyImport('subprocess')
+platform = LazyImport('platform')
+shlex = LazyImport('shlex')
+shutil = LazyImport('shutil')
+tempfile = LazyImport('tempfile')
+ctypes = LazyImport('ctypes')
+socketserver = LazyImport('socketserver')
+concurrent_futures = LazyImport('concurrent.futures')
+http_client = LazyImport('http.client')
+http_server = LazyImport('http.server')
+sqlite3 = LazyImport('sqlite3')
+hmac = LazyImport('hmac')
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+DATA_DIR = Path.home() / '.ollama' / 'discord'
+# Next to the script in installer layouts, in DATA_DIR when installed as a package
+CONFIG_PATH = Path(__file__).parent / 'config.json'
+if not CONFIG_PATH.exists():
+    CONFIG_PATH = DATA_DIR / 'config.json'
+DEFAULT_OLLAMA_HOST = '127.0.0.1:11434'
+NVIDIA_SMI_QUERY_ARGS = '--query-gpu=name,memory.total --format=csv,noheader,nounits'
+NVIDIA_SMI_TELEMETRY_FIELDS = 'index,name,memory.used,memory.total,utilization.gpu,temperature.gpu'
+ROCM_SMI_QUERY = 'rocm-smi --showproductname --showmeminfo vram --json'
+WMIC_GPU_QUERY = 'wmic path win32_VideoController get Name,AdapterRAM /format:list'
+NO_GPU_INFO = {'name': None, 'vram_mib': None, 'vram_str': None}
+# Exact process names only, a substring match would also find ollama-presence itself
+OLLAMA_PROCESS_NAMES = {'ollama', 'ollama.exe'}
+
+# PCI vendor IDs as found in /sys/class/drm/card*/device/vendor
+PCI_VENDORS = {
+    '0x10de': ('nvidia', 'NVIDIA GPU'),
+    '0x1002': ('amd', 'AMD Radeon'),
+    '0x8086': ('intel', 'Intel Graphics')
+}
+
+# Async mode probes: name -> (interval seconds, timeout seconds); interval None follows pollIntervalMin/Max
+ASYNC_PROBES = {
+    'discord': (5, 15),
+    'liveness': (5, 2),
+    'model': (None, 5),
+    'gpu': (60, 10),
+    'log': (5, 2),
+    'version': (300, 10),
+    'config': (2, 5),
+    'memory': (30, 2)
+}
+
+# `ollama ps` table parsing, columns are padded with at least two spaces
+PS_CELL_SPLIT = re.compile(r'\s{2,}')
+PS_HEADER_CELL = re.compile(r'\S+')
+PS_SIZE = re.compile(r'([\d.]+)\s*([KMGT]?i?B)', re.IGNORECASE)
+PS_PROCESSOR = re.compile(r'(\d+)%(?:/(\d+)%)?\s+(CPU/GPU|GPU|CPU)', re.IGNORECASE)
+PS_UNTIL = re.compile(r'(an?|about an?|less than an?|\d+)\s+(second|minute|hour|day|week|month|year)s?', re.IGNORECASE)
+SIZE_UNITS = {'B': 1, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4,
+              'KIB': 1024, 'MIB': 1024 ** 2, 'GIB': 1024 ** 3, 'TIB': 1024 ** 4}
+UNTIL_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400, 'week': 604800, 'month': 2592000, 'year': 31536000}
+
+def parse_human_bytes(text):
+    """'5.4 GB' -> 5400000000 (Ollama prints decimal units), None if unparseable."""
+    match = PS_SIZE.search(text or '')
+    if not match:
+        return None
+    return int(float(match.group(1)) * SIZE_UNITS.get(match.group(2).upper(), 1))
+
+def parse_processor(text):
+    """'100% GPU', '100% CPU' or '48%/52% CPU/GPU' -> (cpu_percent, gpu_percent)."""
+    match = PS_PROCESSOR.search(text or '')
+    if not match:
+        return None, None
+    first, second, kind = int(match.group(1)), match.group(2), match.group(3).upper()
+    if kind == 'CPU/GPU':
+        return first, int(second) if second is not None else 100 - first
+    if kind == 'GPU':
+        return 100 - first, first
+    return first, 100 - first
+
+def parse_until(text):
+    """Seconds until the model unloads from '4 minutes from now', 'About an hour from now', ...; None for 'Forever' or unknown."""
+    match = PS_UNTIL.search(text or '')
+    if not match:
+        return None
+    amount = match.group(1).lower()
+    count = int(amount) if amount.isdigit() else (0 if amount.startswith('less') else 1)
+    return count * UNTIL_SECONDS[match.group(2).lower()]
+
+def parse_ps_table(stdout):
+    """Parse the `ollama ps` table into one record per loaded model.
+
+    Columns are looked up by header name, so reordered or added columns (CONTEXT in
+    newer releases) don't matter. Rows are split on runs of two or more spaces, which
+    keeps names with single spaces intact, and fall back to the header's column
+    offsets when the cell count doesn't match.
+    """
+    lines = [line.rstrip() for line in (stdout or '').splitlines() if line.strip()]
+    if len(lines) < 2:
+        return []
+    
+    header = lines[0]
+    columns = [(m.group(0).upper(), m.start()) for m in PS_HEADER_CELL.finditer(header)]
+    if not columns or columns[0][0] != 'NAME':
+        # Unknown layout, the first word of each row is the best guess at a name
+        return [{'model': line.split()[0]} for line in lines[1:]]
+    
+    names = [name for name, start in columns]
+    records = []
+    for line in lines[1:]:
+        cells = PS_CELL_SPLIT.split(line.strip())
+        if len(cells) != len(columns):
+            bounds = [start for name, start in columns] + [None]
+            cells = [line[bounds[i]:bounds[i + 1]].strip() for i in range(len(columns))]
+        row = dict(zip(names, cells))
+        if not row.get('NAME'):
+            continue
+        
+        size = parse_human_bytes(row.get('SIZE'))
+        cpu_percent, gpu_percent = parse_processor(row.get('PROCESSOR'))
+        expires_in = parse_until(row.get('UNTIL'))
+        records.append({
+            'model': row['NAME'],
+            'digest': row.get('ID') or None,
+            'size': size,
+            'size_vram': size * gpu_percent // 100 if size is not None and gpu_percent is not None else None,
+            'vram_percent': gpu_percent,
+            'cpu_percent': cpu_percent,
+            'processor': row.get('PROCESSOR') or None,
+            'until': row.get('UNTIL') or None,
+            'expires_at': (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat() if expires_in is not None else None
+        })
+    return records
+
+# Ollama server log lines: a finished inference request (gin access log) and llama.cpp's generation timing
+LOG_REQUEST = re.compile(r'\[GIN\].*?\|\s*2\d\d\s*\|.*"(?:/api/(?:generate|chat)|/v1/(?:chat/)?completions)"')
+LOG_EVAL_TIMING = re.compile(r'(?<!prompt )eval time\s*=\s*([\d.]+)\s*ms\s*/\s*(\d+)\s*(?:runs|tokens)')
+# Timestamps of gin and slog lines, both in the server's local time
+LOG_TIME = re.compile(r'\[GIN\] (\d{4})/(\d\d)/(\d\d) - (\d\d):(\d\d):(\d\d)|time=(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)')
+
+# `ollama --version` output, most specific first; the last one catches bare version numbers
+VERSION_PATTERNS = [
+    re.compile(r'ollama version is (.+)', re.IGNORECASE),
+    re.compile(r'version (.+)', re.IGNORECASE),
+    re.compile(r'v?(\d+\.\d+\.\d+)', re.IGNORECASE)
+]
+
+def parse_log_line(line):
+    """('request',) for a completed generate/chat request, ('eval', tokens, seconds) for a timing line, else None."""
+    if 'eval time' in line:
+        match = LOG_EVAL_TIMING.search(line)
+        if match and float(match.group(1)) > 0:
+            return ('eval', int(match.group(2)), float(match.group(1)) / 1000)
+    elif '[GIN]' in line and LOG_REQUEST.search(line):
+        return ('request',)
+    return None
+
+def parse_log_time(line):
+    """Seconds for the line's own timestamp, None if it has none; only meaningful relative to other lines."""
+    match = LOG_TIME.search(line)
+    if not match:
+        return None
+    try:
+        return datetime(*(int(part) for part in match.groups() if part is not None)).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+# config.json keys: accepted types and the smallest allowed value for numbers
+CONFIG_SCHEMA = {
+    'clientId': ((str, int), None),
+    'largeImageKey': ((str,), None),
+    'autoStart': ((bool,), None),
+    'autoExit': ((bool,), None),
+    'autoExitAfter': ((int, float), 0),
+    'ollamaCmd': ((str,), None),
+    'ollamaHost': ((str,), None),
+    'ollamaHosts': ((list,), None),
+    'ollamaHostsWait': ((int, float), 0),
+    'ollamaLog': ((str, type(None)), None),
+    'ollamaStartTimeout': ((int, float), 1),
+    'superviseOllama': ((bool,), None),
+    'asyncMode': ((bool,), None),
+    'leanMode': ((bool,), None),
+    'pollIntervalMin': ((int, float), 0.1),
+    'pollIntervalMax': ((int, float), 0.1),
+    'presenceRotate': ((int, float), 0),
+    'hardwareCacheTtl': ((int, float), 0),
+    'nvidiaSmi': ((str,), None),
+    'gpuTelemetry': ((bool,), None),
+    'gpuTelemetryInterval': ((int,), 100),
+    'throughputWindow': ((int, float), 1),
+    'logLevel': ((str,), None),
+    'logMaxBytes': ((int,), 0),
+    'logBackupCount': ((int,), 0),
+    'metricsPort': ((int,), 0),
+    'discordReconnectMax': ((int, float), 1),
+    'history': ((bool,), None),
+    'historyFlushInterval': ((int, float), 1),
+    'historyRawDays': ((int,), 7),
+    'historyPresence': ((bool,), None)
+}
+
+# Only read at startup, changing them in a running service needs a restart
+CONFIG_RESTART_KEYS = {'asyncMode', 'leanMode', 'logMaxBytes', 'logBackupCount'}
+
+def validate_config(config):
+    """{key: problem} for every value that doesn't match CONFIG_SCHEMA, empty if valid; unknown keys are ignored."""
+    errors = {}
+    for key, (types, minimum) in CONFIG_SCHEMA.items():
+        if key not in config:
+            continue
+        value = config[key]
+        # bool is an int subclass, `true` is not a valid number of seconds
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            errors[key] = f"expected {' or '.join(t.__name__ for t in types)}, got {type(value).__name__}"
+        elif minimum is not None and value < minimum:
+            errors[key] = f"must be at least {minimum}, got {value}"
+    level = config.get('logLevel')
+    if isinstance(level, str) and not isinstance(getattr(logging, level.upper(), None), int):
+        errors['logLevel'] = f"unknown level {level}"
+    return errors
+
+def parse_ollama_hosts(entries):
+    """Normalise the ollamaHosts list: 'host:port' strings or {"host", "name", "timeout"} objects."""
+    endpoints = []
+    for entry in entries or []:
+        if isinstance(entry, str):
+            entry = {'host': entry}
+        if not isinstance(entry, dict) or not entry.get('host'):
+            continue
+        host, port = parse_ollama_host(entry['host'])
+        endpoints.append({
+            'name': entry.get('name') or f"{host}:{port}",
+            'host': host,
+            'port': port,
+            'timeout': entry.get('timeout', 2)
+        })
+    return endpoints
+
+def parse_ollama_host(value):
+    """Split an OLLAMA_HOST style value ('http://host:port', 'host:port', 'host') into (host, port)."""
+    value = (value or DEFAULT_OLLAMA_HOST).strip()
+    if '://' in value:
+        value = value.split('://', 1)[1]
+    value = value.split('/', 1)[0]
+    host, sep, port = value.rpartition(':')
+    if not sep or not port.isdigit():
+        host, port = value, '11434'
+    host = host.strip('[]') or '127.0.0.1'
+    if host == '0.0.0.0':
+        host = '127.0.0.1'
+    return host, int(port)
+
+class ServiceMetrics:
+    """Timing histograms and counters for the service, rendered in Prometheus text format."""
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.last_runs = {}
+
+    def observe(self, probe, seconds):
+        with self.lock:
+            histogram = self.histograms.get(probe)
+            if histogram is None:
+                histogram = self.histograms[probe] = {'buckets': [0] * len(self.BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, probe):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(probe, elapsed)
+            # Replaced, never mutated, so readers on other threads can use it without the lock
+            self.last_runs[probe] = {'at': time.time(), 'seconds': round(elapsed, 6), 'error': error}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'probes': {
+                    probe: {'count': h['count'], 'sum': round(h['sum'], 6), 'avg': round(h['sum'] / h['count'], 6) if h['count'] else None}
+                    for probe, h in self.histograms.items()
+                },
+                'counters': {
+                    name + ''.join(f"[{k}={v}]" for k, v in labels): value
+                    for (name, labels), value in self.counters.items()
+                },
+                'gauges': dict(self.gauges)
+            }
+
+    def render(self):
+        lines = [
+            '# HELP ollama_presence_probe_seconds Time spent in each probe.',
+            '# TYPE ollama_presence_probe_seconds histogram'
+        ]
+        with self.lock:
+            for probe, histogram in sorted(self.histograms.items()):
+                for bound, count in zip(self.BUCKETS, histogram['buckets']):
+                    lines.append(f'ollama_presence_probe_seconds_bucket{{probe="{probe}",le="{bound}"}} {count}')
+                lines.append(f'ollama_presence_probe_seconds_bucket{{probe="{probe}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'ollama_presence_probe_seconds_sum{{probe="{probe}"}} {histogram["sum"]:.6f}')
+                lines.append(f'ollama_presence_probe_seconds_count{{probe="{probe}"}} {histogram["count"]}')
+            
+            names = sorted({name for name, labels in self.counters})
+            for name in names:
+                lines.append(f'# TYPE ollama_presence_{name} counter')
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                        lines.append(f'ollama_presence_{name}{{{label_text}}} {value}' if label_text else f'ollama_presence_{name} {value}')
+            
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f'# TYPE ollama_presence_{name} gauge')
+                lines.append(f'ollama_presence_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+class MetricsServer:
+    """Serves ServiceMetrics on http://127.0.0.1:<port>/metrics from a daemon thread."""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        self.metrics = metrics
+        metrics_ref = metrics
+
+        class Handler(http_server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics_ref.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = http_server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def http_response_parser():
+    """Parses one HTTP/1.1 response without doing any I/O, shared by the socket and asyncio API clients.
+
+    A generator: it yields what to read next, ('line', None), ('exactly', size) or ('rest', None),
+    is sent the bytes read, and returns (status, headers, body) when the response is complete.
+    """
+    status_line = yield ('line', None)
+    if not status_line:
+        raise ConnectionResetError("connection closed by server")
+    status = int(status_line.split()[1])
+    
+    headers = {}
+    while True:
+        line = (yield ('line', None)).decode('latin-1').strip()
+        if not line:
+            break
+        key, _, value = line.partition(':')
+        headers[key.strip().lower()] = value.strip()
+    
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((yield ('line', None)).split(b';')[0], 16)
+            if size == 0:
+                yield ('line', None)
+                break
+            chunks.append((yield ('exactly', size)))
+            yield ('line', None)
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = yield ('exactly', int(headers['content-length']))
+    else:
+        body = yield ('rest', None)
+        headers['connection'] = 'close'
+    return status, headers, body
+
+class OllamaApiClient:
+    """Talks to the Ollama REST API over a single keep-alive HTTP connection."""
+
+    def __init__(self, host='127.0.0.1', port=11434, timeout=2, metrics=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.metrics = metrics
+        self.connects = 0
+        self.conn = None
+
+    def count_connect(self):
+        self.connects += 1
+        if self.metrics and self.connects > 1:
+            self.metrics.inc('reconnects_total', target='ollama_api')
+
+    def close(self):
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def get_json(self, path):
+        """GET a JSON document, returns None if the API is unreachable or answers with an error."""
+        for attempt in range(2):
+            reused = self.conn is not None
+            try:
+                if self.conn is None:
+                    self.conn = http_client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                    self.count_connect()
+                self.conn.request('GET', path, headers={'Connection': 'keep-alive'})
+                response = self.conn.getresponse()
+                body = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                if response.status != 200:
+                    return None
+                return json.loads(body.decode('utf-8'))
+            except (http_client.HTTPException, OSError, ValueError):
+                self.close()
+                # A reused keep-alive connection may have been dropped by the server, retry once on a fresh one
+                if not reused:
+                    return None
+        return None
+
+    def ps(self):
+        """Return the loaded models from /api/ps, or None if the API is unreachable."""
+        return self.parse_ps(self.get_json('/api/ps'))
+
+    def version(self):
+        """Server version from /api/version, or None if the API is unreachable."""
+        return self.parse_version(self.get_json('/api/version'))
+
+    @staticmethod
+    def parse_version(data):
+        version = data.get('version') if isinstance(data, dict) else None
+        return str(version) if version else None
+
+    @staticmethod
+    def parse_ps(data):
+        if data is None:
+            return None
+        
+        models = []
+        for entry in data.get('models') or []:
+            size = entry.get('size') or 0
+            size_vram = entry.get('size_vram') or 0
+            models.append({
+                'model': entry.get('name') or entry.get('model'),
+                'digest': entry.get('digest'),
+                'size': size,
+                'size_vram': size_vram,
+                'vram_percent': round(size_vram * 100 / size) if size else None,
+                'cpu_percent': 100 - round(size_vram * 100 / size) if size else None,
+                'expires_at': entry.get('expires_at')
+            })
+        return models
+
+class LeanOllamaApiClient(OllamaApiClient):
+    """OllamaApiClient on a plain keep-alive socket, used in leanMode.
+
+    http.client pulls in ssl and the email package (~2.5 MB of RSS) for what is
+    one GET at a time; responses go through http_response_parser like AsyncOllamaApiClient's.
+    """
+
+    def close(self):
+        if self.conn:
+            sock, reader = self.conn
+            for handle in (reader, sock):
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self.conn = None
+
+    def get_json(self, path):
+        for attempt in range(2):
+            reused = self.conn is not None
+            try:
+                if self.conn is None:
+                    sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                    self.conn = (sock, sock.makefile('rb'))
+                    self.count_connect()
+                sock, reader = self.conn
+                request = f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nAccept: application/json\r\n\r\n"
+                sock.sendall(request.encode('ascii'))
+                status, headers, body = self.read_response(reader)
+                if headers.get('connection', '').lower() == 'close':
+                    self.close()
+                if status != 200:
+                    return None
+                return json.loads(body.decode('utf-8'))
+            except (OSError, ValueError, IndexError):
+                self.close()
+                if not reused:
+                    return None
+        return None
+
+    @staticmethod
+    def read_exactly(reader, size):
+        data = reader.read(size)
+        if len(data) != size:
+            raise ConnectionResetError("connection closed by server")
+        return data
+
+    def read_response(self, reader):
+        parser = http_response_parser()
+        try:
+            kind, size = next(parser)
+            while True:
+                if kind == 'line':
+                    data = reader.readline()
+                elif kind == 'exactly':
+                    data = self.read_exactly(reader, size)
+                else:
+                    data = reader.read()
+                kind, size = parser.send(data)
+        except StopIteration as done:
+            return done.value
+
+class AsyncOllamaApiClient(OllamaApiClient):
+    """asyncio flavour of OllamaApiClient, keeps one keep-alive stream open to the API."""
+
+    def __init__(self, host='127.0.0.1', port=11434, timeout=2, metrics=None):
+        super().__init__(host, port, timeout, metrics)
+        self.reader = None
+        self.writer = None
+        # Created on first use so it binds to the running loop (Python < 3.10)
+        self.lock = None
+
+    def close(self):
+        if self.writer:
+            try:
+                self.writer.close()
+            except Exception:
+                pass
+        self.reader = None
+        self.writer = None
+
+    async def get_json(self, path):
+        # The model and version probes share the stream, one request at a time
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            return await self.request_json(path)
+
+    async def request_json(self, path):
+        for attempt in range(2):
+            reused = self.writer is not None
+            try:
+                if self.writer is None:
+                    self.reader, self.writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                    self.count_connect()
+                request = f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nAccept: application/json\r\n\r\n"
+                self.writer.write(request.encode('ascii'))
+                await self.writer.drain()
+                status, headers, body = await asyncio.wait_for(self.read_response(), self.timeout)
+                if headers.get('connection', '').lower() == 'close':
+                    self.close()
+                if status != 200:
+                    return None
+                return json.loads(body.decode('utf-8'))
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError, ValueError):
+                self.close()
+                if not reused:
+                    return None
+        return None
+
+    async def read_response(self):
+        parser = http_response_parser()
+        try:
+            kind, size = next(parser)
+            while True:
+                if kind == 'line':
+                    data = await self.reader.readline()
+                elif kind == 'exactly':
+                    data = await self.reader.readexactly(size)
+                else:
+                    data = await self.reader.read()
+                kind, size = parser.send(data)
+        except StopIteration as done:
+            return done.value
+
+    async def ps(self):
+        return self.parse_ps(await self.get_json('/api/ps'))
+
+    async def version(self):
+        return self.parse_version(await self.get_json('/api/version'))
+
+class CircuitBreaker:
+    """Stops calling a host after threshold failures in a row, lets one trial call through every reset_after seconds."""
+
+    def __init__(self, threshold=3, reset_after=30):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_after
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        """Record a failed call, returns True if this tripped the breaker."""
+        self.failures += 1
+        if self.opened_at is not None:
+            # Failed trial call, stay open for another reset_after
+            self.opened_at = time.monotonic()
+            return False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+class OllamaEndpoint:
+    """One remote Ollama host: its keep-alive clients, circuit breaker and last /api/ps answer."""
+
+    def __init__(self, name, host, port, timeout, metrics):
+        self.name = name
+        self.client = OllamaApiClient(host, port, timeout, metrics)
+        self.async_client = None
+        self.breaker = CircuitBreaker()
+        self.models = None
+        self.pending = None
+
+    def close(self):
+        self.client.close()
+        if self.async_client:
+            self.async_client.close()
+
+class OllamaHostPool:
+    """Polls several Ollama hosts concurrently and merges their loaded models.
+
+    Every host keeps its own keep-alive connection, timeout and circuit breaker.
+    A poll waits at most `wait` seconds for the requests it started; a host that is
+    slower keeps its request running and its answer is picked up by a later poll,
+    so it never holds up the others.
+    """
+
+    def __init__(self, endpoints, logger, metrics, wait=1):
+        self.logger = logger
+        self.metrics = metrics
+        self.wait = wait
+        self.endpoints = [OllamaEndpoint(e['name'], e['host'], e['port'], e['timeout'], metrics) for e in endpoints]
+        self.executor = None
+
+    def harvest(self, endpoint):
+        """Apply one finished /api/ps call, only ever called from the polling thread or event loop."""
+        try:
+            models = endpoint.pending.result()
+        except Exception:
+            models = None
+        endpoint.pending = None
+        if models is None:
+            self.metrics.inc('host_failures_total', host=endpoint.name)
+            if endpoint.breaker.failure():
+                self.logger.warning(f"Ollama host {endpoint.name} unreachable, pausing it for {endpoint.breaker.reset_after}s")
+            endpoint.models = None
+            return
+        if endpoint.breaker.open or endpoint.models is None:
+            self.logger.info(f"Ollama host {endpoint.name} reachable")
+        endpoint.breaker.success()
+        endpoint.models = models
+
+    def poll(self):
+        if self.executor is None:
+            self.executor = concurrent_futures.ThreadPoolExecutor(len(self.endpoints), thread_name_prefix='ollama-host')
+        
+        futures = []
+        for endpoint in self.endpoints:
+            if endpoint.pending is not None:
+                if not endpoint.pending.done():
+                    # Still busy from an earlier poll, known to be slow: don't wait for it again
+                    continue
+                self.harvest(endpoint)
+            if endpoint.breaker.allow():
+                endpoint.pending = self.executor.submit(endpoint.client.ps)
+                futures.append(endpoint.pending)
+        
+        if futures:
+            concurrent_futures.wait(futures, self.wait)
+        for endpoint in self.endpoints:
+            if endpoint.pending is not None and endpoint.pending.done():
+                self.harvest(endpoint)
+
+    async def poll_async(self):
+        tasks = []
+        for endpoint in self.endpoints:
+            if endpoint.async_client is None:
+                client = endpoint.client
+                endpoint.async_client = AsyncOllamaApiClient(client.host, client.port, client.timeout, self.metrics)
+            if endpoint.pending is not None:
+                if not endpoint.pending.done():
+                    continue
+                self.harvest(endpoint)
+            if endpoint.breaker.allow():
+                endpoint.pending = asyncio.ensure_future(endpoint.async_client.ps())
+                tasks.append(endpoint.pending)
+        
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.wait)
+        for endpoint in self.endpoints:
+            if endpoint.pending is not None and endpoint.pending.done():
+                self.harvest(endpoint)
+
+    def reachable(self):
+        return any(endpoint.models is not None for endpoint in self.endpoints)
+
+    def models(self):
+        """Loaded models of every reachable host, each tagged with its host name."""
+        return [
+            {**model, 'host': endpoint.name}
+            for endpoint in self.endpoints if endpoint.models
+            for model in endpoint.models
+        ]
+
+    def close(self):
+        for endpoint in self.endpoints:
+            if endpoint.pending is not None:
+                endpoint.pending.cancel()
+            endpoint.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+class OllamaLivenessTracker:
+    """Finds the Ollama process once, then only watches that PID until it goes away."""
+
+    def __init__(self, host, port, logger, rescan_interval=30, lean=False):
+        self.host = host
+        self.port = port
+        self.logger = logger
+        self.lean = lean
+        self.rescan_interval = rescan_interval
+        self.proc = None
+        self.last_scan = None
+
+    @property
+    def pid(self):
+        return self.proc.pid if self.proc else None
+
+    def watch(self, pid):
+        """Track a known Ollama PID (e.g. one we started) without scanning."""
+        try:
+            self.proc = psutil.Process(pid)
+            self.logger.info(f"Watching Ollama process PID {pid}")
+        except psutil.Error:
+            self.proc = None
+
+    def check(self):
+        if self.watched_alive() or self.rescan():
+            return True
+        return self.port_open()
+
+    async def check_async(self):
+        if self.watched_alive():
+            return True
+        if self.rescan_due():
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(None, self.rescan):
+                return True
+        return await self.port_open_async()
+
+    def watched_alive(self):
+        if self.proc is not None:
+            try:
+                # is_running() also compares the create time, so a recycled PID is not mistaken for Ollama
+                if self.proc.is_running() and self.proc.status() != psutil.STATUS_ZOMBIE:
+                    return True
+            except psutil.Error:
+                pass
+            self.logger.info(f"Ollama process PID {self.proc.pid} is gone")
+            self.proc = None
+            self.last_scan = None
+        return False
+
+    def rescan_due(self):
+        return self.last_scan is None or time.monotonic() - self.last_scan >= self.rescan_interval
+
+    def rescan(self):
+        """Scan the process table if the rescan interval allows it, returns True if Ollama was found."""
+        if not self.rescan_due():
+            return False
+        self.last_scan = time.monotonic()
+        self.proc = self.scan()
+        if self.lean:
+            # process_iter keeps a Process object for every process on the system between calls
+            clear = getattr(psutil.process_iter, 'cache_clear', None)
+            if clear is not None:
+                clear()
+            else:
+                getattr(psutil, '_pmap', {}).clear()
+        if self.proc is not None:
+            self.logger.info(f"Found Ollama process PID {self.proc.pid}")
+            return True
+        return False
+
+    def scan(self):
+        """Walk the process table once looking for an Ollama process."""
+        own = {os.getpid(), os.getppid()}
+        for proc in psutil.process_iter(['name', 'exe']):
+            try:
+                if proc.pid in own:
+                    continue
+                proc_name = (proc.info.get('name') or '').lower()
+                proc_exe = os.path.basename(proc.info.get('exe') or '').lower()
+                if proc_name in OLLAMA_PROCESS_NAMES or proc_exe in OLLAMA_PROCESS_NAMES:
+                    return proc
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        return None
+
+    def port_open(self):
+        try:
+            with socket.create_connection((self.host, self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    async def port_open_async(self):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), 1)
+        except (asyncio.TimeoutError, OSError):
+            return False
+        writer.close()
+        return True
+
+class PresencePublisher:
+    """Remembers the last presence sent and only talks to Discord when it changes.
+
+    Discord accepts 5 activity updates per 20 seconds; changes that arrive while
+    the limit is used up are coalesced and only the newest one is sent later.
+    """
+
+    def __init__(self, rpc=None, max_updates=5, window=20, metrics=None):
+        self.rpc = rpc
+        self.metrics = metrics or ServiceMetrics()
+        self.max_updates = max_updates
+        self.window = window
+        self.sent_times = deque(maxlen=max_updates)
+        self.last_payload = None
+        self.pending = None
+        self.current = None
+        self.session_model = None
+        self.session_start = None
+
+    def session_start_for(self, model_name):
+        """Stable start timestamp for the current model, so Discord's elapsed timer keeps counting."""
+        if model_name != self.session_model:
+            self.session_model = model_name
+            self.session_start = int(time.time()) if model_name else None
+        return self.session_start
+
+    def rate_limited(self):
+        return len(self.sent_times) == self.max_updates and time.monotonic() - self.sent_times[0] < self.window
+
+    def queue(self, payload):
+        self.current = payload
+        if payload == self.last_payload:
+            self.pending = None
+        else:
+            self.pending = payload
+
+    def take(self):
+        """Pop the pending payload if the rate limit allows sending it now."""
+        if self.pending is None or self.rate_limited():
+            return None
+        payload = self.pending
+        self.pending = None
+        self.sent_times.append(time.monotonic())
+        self.last_payload = payload
+        return payload
+
+    def publish(self, payload):
+        """Queue payload and send it if allowed, returns True if rpc.update was called."""
+        self.queue(payload)
+        return self.flush()
+
+    def flush(self):
+        payload = self.take()
+        if payload is None:
+            return False
+        try:
+            with self.metrics.timer('rpc_update'):
+                self.rpc.update(**payload)
+        except Exception:
+            self.last_payload = None
+            raise
+        return True
+
+    async def publish_async(self, payload):
+        self.queue(payload)
+        return await self.flush_async()
+
+    async def flush_async(self):
+        payload = self.take()
+        if payload is None:
+            return False
+        try:
+            with self.metrics.timer('rpc_update'):
+                await self.rpc.update(**payload)
+        except Exception:
+            self.last_payload = None
+            raise
+        return True
+
+    def rearm(self):
+        """Make the next flush resend the current payload, e.g. to a freshly reconnected Discord."""
+        self.last_payload = None
+        self.pending = self.current
+
+    def clear(self):
+        self.sent_times.append(time.monotonic())
+        self.reset()
+        self.rpc.clear()
+
+    async def clear_async(self):
+        self.sent_times.append(time.monotonic())
+        self.reset()
+        await self.rpc.clear()
+
+    def reset(self):
+        self.last_payload = None
+        self.pending = None
+        self.current = None
+        self.session_model = None
+        self.session_start = None
+
+class DirectoryWatcher:
+    """Notices entries being created, replaced or removed in one directory.
+
+    Uses inotify on Linux (filtered to names starting with prefix, a string or a
+    tuple of them) and falls back
+    to comparing the mtime of poll_path (the directory itself by default)
+    elsewhere, which costs one stat per check.
+    """
+
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    DEFAULT_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, path, prefix='', mask=DEFAULT_MASK, poll_path=None):
+        self.path = Path(path)
+        self.poll_path = Path(poll_path) if poll_path else self.path
+        self.prefix = tuple(os.fsencode(p) for p in prefix) if isinstance(prefix, tuple) else os.fsencode(prefix)
+        self.fd = None
+        self.stamp = self.read_stamp()
+        if sys.platform.startswith('linux'):
+            self.fd = self.inotify(mask)
+
+    def inotify(self, mask):
+        try:
+            # The running interpreter already has libc loaded; find_library would run ldconfig and pull in subprocess
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, os.fsencode(str(self.path)), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def read_stamp(self):
+        try:
+            st = os.stat(self.poll_path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def changed(self):
+        """True if a matching entry changed since the last call, never blocks."""
+        if self.fd is None:
+            stamp = self.read_stamp()
+            changed, self.stamp = stamp != self.stamp, stamp
+            return changed
+        
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except (BlockingIOError, InterruptedError):
+                return changed
+            except OSError:
+                return True
+            offset = 0
+            while offset + self.EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if name.startswith(self.prefix):
+                    changed = True
+
+    def close(self):
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+# Directories under the runtime dir that can hold Discord's IPC socket or lead to one, with the entry names
+# that matter in each. The Snap and Flatpak directories only appear once that Discord has started, so their
+# parents are watched for them too.
+DISCORD_IPC_WATCH = {
+    '.': ('discord-ipc-', 'snap.discord', 'app'),
+    'snap.discord': ('discord-ipc-',),
+    'app': ('com.discordapp.Discord',),
+    'app/com.discordapp.Discord': ('discord-ipc-',),
+    'app/com.discordapp.DiscordCanary': ('discord-ipc-',)
+}
+
+def discord_ipc_base():
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if not base:
+        run_dir = f"/run/user/{os.getuid()}"
+        base = run_dir if os.path.isdir(run_dir) else tempfile.gettempdir()
+    return base
+
+def discord_ipc_watch_dirs():
+    """{directory: entry name prefixes} for the DISCORD_IPC_WATCH directories that exist right now."""
+    if os.name == 'nt':
+        return {}
+    base = discord_ipc_base()
+    return {path: prefixes for path, prefixes in ((os.path.join(base, sub), prefixes) for sub, prefixes in DISCORD_IPC_WATCH.items())
+            if os.path.isdir(path)}
+
+def discord_ipc_dirs():
+    """Directories Discord puts its discord-ipc-N socket in, the same places pypresence looks."""
+    return [path for path, prefixes in discord_ipc_watch_dirs().items() if 'discord-ipc-' in prefixes]
+
+def find_discord_ipc(dirs):
+    """(path, inode) of the first Discord IPC socket, None if Discord isn't running.
+
+    Windows named pipes can't be listed without opening them, so there the pipe
+    is assumed to exist and the reconnect backoff does the pacing.
+    """
+    if os.name == 'nt':
+        return ('discord-ipc', 0)
+    for directory in dirs:
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('discord-ipc-'):
+                        return (entry.path, entry.inode())
+        except OSError:
+            continue
+    return None
+
+def is_discord_disconnect(error):
+    """Anything but Discord rejecting the payload itself means the IPC connection is gone."""
+    if isinstance(error, DiscordIpcError):
+        return False
+    if 'pypresence' not in sys.modules:
+        # Lean client in use, don't import pypresence just to look at its exception types
+        return True
+    return not isinstance(error, (pypresence.ServerError, pypresence.InvalidArgument))
+
+class DiscordIpcError(Exception):
+    """Discord answered a frame with an error; the connection itself is still fine."""
+
+class DiscordIpcClient:
+    """Minimal blocking Discord IPC client, used instead of pypresence.Presence in leanMode.
+
+    Speaks only the handshake, SET_ACTIVITY and close frames, with the same
+    connect/update/clear/close calls, so neither pypresence nor the asyncio it
+    runs on (together ~8 MB of RSS) is ever imported.
+    """
+
+    HEADER = struct.Struct('<II')
+    OP_HANDSHAKE = 0
+    OP_FRAME = 1
+    OP_CLOSE = 2
+
+    def __init__(self, client_id, path=None, timeout=5):
+        self.client_id = str(client_id)
+        self.path = path
+        self.timeout = timeout
+        self.sock = None
+        self.pipe = None
+        self.nonce = 0
+
+    def connect(self):
+        if os.name == 'nt':
+            for index in range(10):
+                try:
+                    self.pipe = open(f"\\\\?\\pipe\\discord-ipc-{index}", 'w+b', buffering=0)
+                    break
+                except OSError:
+                    continue
+            else:
+                raise ConnectionError("no Discord IPC pipe found")
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self.sock = sock
+        
+        self.send(self.OP_HANDSHAKE, {'v': 1, 'client_id': self.client_id})
+        op, reply = self.receive()
+        if op == self.OP_CLOSE or reply.get('evt') == 'ERROR':
+            self.close()
+            raise ConnectionError(f"Discord rejected the handshake: {reply.get('message') or reply.get('data')}")
+
+    def send(self, op, payload):
+        body = json.dumps(payload).encode('utf-8')
+        frame = self.HEADER.pack(op, len(body)) + body
+        if self.pipe is not None:
+            self.pipe.write(frame)
+        elif self.sock is not None:
+            self.sock.sendall(frame)
+        else:
+            raise ConnectionError("not connected")
+
+    def read_exactly(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.pipe.read(size - len(data)) if self.pipe is not None else self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Discord closed the connection")
+            data += chunk
+        return data
+
+    def receive(self):
+        op, length = self.HEADER.unpack(self.read_exactly(self.HEADER.size))
+        return op, json.loads(self.read_exactly(length).decode('utf-8'))
+
+    def set_activity(self, activity):
+        self.nonce += 1
+        self.send(self.OP_FRAME, {'cmd': 'SET_ACTIVITY', 'args': {'pid': os.getpid(), 'activity': activity}, 'nonce': str(self.nonce)})
+        op, reply = self.receive()
+        if op == self.OP_CLOSE:
+            raise ConnectionError(f"Discord closed the connection: {reply.get('message')}")
+        if reply.get('evt') == 'ERROR':
+            raise DiscordIpcError((reply.get('data') or {}).get('message') or 'SET_ACTIVITY failed')
+        return reply
+
+    def update(self, **payload):
+        """Same keyword arguments as pypresence's Presence.update, None values are left out."""
+        activity = {key: payload[key] for key in ('details', 'state') if payload.get(key) is not None}
+        if payload.get('start') is not None:
+            activity['timestamps'] = {'start': payload['start']}
+        assets = {key: payload[key] for key in ('large_image', 'large_text', 'small_image', 'small_text') if payload.get(key) is not None}
+        if assets:
+            activity['assets'] = assets
+        return self.set_activity(activity)
+
+    def clear(self):
+        return self.set_activity(None)
+
+    def close(self):
+        try:
+            self.send(self.OP_CLOSE, {'v': 1, 'client_id': self.client_id})
+        except (OSError, ValueError):
+            pass
+        for handle in (self.sock, self.pipe):
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self.sock = None
+        self.pipe = None
+
+class DiscordConnection:
+    """Keeps a Discord IPC session alive across Discord starting late, quitting and restarting.
+
+    Failed connects back off exponentially from min_backoff to max_backoff. The IPC
+    socket directories are watched so a freshly started Discord is picked up right
+    away, and a replaced or deleted socket is treated as a lost connection.
+    """
+
+    def __init__(self, client_id, logger, metrics, min_backoff=1, max_backoff=60, lean=False):
+        self.client_id = client_id
+        self.lean = lean
+        self.logger = logger
+        self.metrics = metrics
+        self.min_backoff = min_backoff
+        self.max_backoff = max(min_backoff, max_backoff)
+        self.delay = min_backoff
+        self.next_attempt = 0
+        self.rpc = None
+        self.socket = None
+        self.connects = 0
+        self.failures = 0
+        self.event_seen = False
+        # Called with each watcher added after startup, async mode hooks it up to the event loop
+        self.on_watch = None
+        self.watchers = []
+        self.refresh_watchers()
+
+    def refresh_watchers(self):
+        """Start watching directories that appeared since the last call, e.g. a Flatpak or Snap Discord's."""
+        watched = {str(w.path) for w in self.watchers}
+        for path, prefixes in discord_ipc_watch_dirs().items():
+            if path not in watched:
+                watcher = DirectoryWatcher(path, prefixes)
+                self.watchers.append(watcher)
+                if self.on_watch is not None:
+                    self.on_watch(watcher)
+
+    def socket_changed(self):
+        changed = self.event_seen
+        self.event_seen = False
+        for watcher in self.watchers:
+            if watcher.changed():
+                changed = True
+        if changed:
+            self.refresh_watchers()
+        return changed
+
+    def check(self):
+        """Cheap per-tick check, returns True if a connect attempt is due now."""
+        if self.watchers and self.socket_changed():
+            current = find_discord_ipc(discord_ipc_dirs())
+            if self.rpc is not None and current != self.socket:
+                self.lost("IPC socket went away")
+            elif self.rpc is None and current:
+                # Discord just (re)started, don't wait out the backoff
+                self.next_attempt = 0
+        return self.rpc is None and time.monotonic() >= self.next_attempt
+
+    def begin(self):
+        """Socket to connect through, None (and the next attempt scheduled) if Discord isn't there."""
+        # Also catches directories created while their parent couldn't be watched
+        self.refresh_watchers()
+        socket_id = find_discord_ipc(discord_ipc_dirs())
+        if socket_id is None:
+            # The watchers wake us when the socket shows up, this is only a safety net
+            self.next_attempt = time.monotonic() + (self.max_backoff if self.watchers else self.delay)
+            self.failures += 1
+            if self.failures == 1:
+                self.logger.info("Discord is not running, waiting for it to start")
+        return socket_id
+
+    def connect(self):
+        socket_id = self.begin()
+        if socket_id is None:
+            return False
+        rpc = None
+        try:
+            rpc = DiscordIpcClient(self.client_id, socket_id[0]) if self.lean else pypresence.Presence(self.client_id)
+            rpc.connect()
+        except Exception as e:
+            if rpc is not None:
+                self.close_rpc(rpc)
+            self.failed(e)
+            return False
+        self.succeeded(rpc, socket_id)
+        return True
+
+    async def connect_async(self, loop):
+        socket_id = self.begin()
+        if socket_id is None:
+            return False
+        rpc = None
+        try:
+            rpc = pypresence.AioPresence(self.client_id, loop=loop)
+            await rpc.connect()
+        except Exception as e:
+            if rpc is not None:
+                self.close_rpc(rpc)
+            self.failed(e)
+            return False
+        self.succeeded(rpc, socket_id)
+        return True
+
+    def succeeded(self, rpc, socket_id):
+        self.rpc = rpc
+        self.socket = socket_id
+        self.connects += 1
+        self.failures = 0
+        self.delay = self.min_backoff
+        if self.connects > 1:
+            self.metrics.inc('reconnects_total', target='discord')
+            self.logger.info("Reconnected to Discord")
+        else:
+            self.logger.info("Connected to Discord")
+
+    def failed(self, error):
+        self.failures += 1
+        self.next_attempt = time.monotonic() + self.delay
+        level = logging.WARNING if self.failures == 1 else logging.DEBUG
+        self.logger.log(level, f"Failed to connect to Discord: {error} (retrying in {self.delay}s)")
+        self.delay = min(self.delay * 2, self.max_backoff)
+
+    def lost(self, reason):
+        if self.rpc is None:
+            return
+        self.logger.warning(f"Lost connection to Discord: {reason}")
+        self.close_rpc(self.rpc)
+        self.rpc = None
+        self.socket = None
+        self.failures = 0
+        self.delay = self.min_backoff
+        self.next_attempt = 0
+
+    def wait(self, timeout, wakes=()):
+        """Sleep for timeout seconds, returning early if Discord's socket appears while disconnected
+        or one of the wakes (sockets or fds) becomes readable. Returns the readable wakes."""
+        wakes = list(wakes)
+        watched = self.watchers if self.rpc is None else []
+        fds = [w.fd for w in watched if w.fd is not None]
+        if len(fds) == len(watched):
+            if not fds and not wakes:
+                time.sleep(timeout)
+                return []
+            try:
+                ready = select.select(fds + wakes, [], [], timeout)[0]
+                if any(fd in fds for fd in ready):
+                    self.event_seen = self.socket_changed()
+                return [fd for fd in ready if fd in wakes]
+            except (OSError, ValueError):
+                time.sleep(timeout)
+            return []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            if wakes:
+                ready = select.select(wakes, [], [], min(remaining, 1))[0]
+                if ready:
+                    return ready
+            else:
+                time.sleep(min(remaining, 1))
+            if self.socket_changed():
+                self.event_seen = True
+                return []
+
+    @staticmethod
+    def close_rpc(rpc):
+        # Presence.close() also closes its private event loop; on a dead pipe only the socket is left to close
+        try:
+            if isinstance(rpc, DiscordIpcClient):
+                rpc.close()
+            elif isinstance(rpc, pypresence.AioPresence):
+                if rpc.sock_writer is not None:
+                    rpc.send_data(2, {'v': 1, 'client_id': rpc.client_id})
+                    rpc.sock_writer.close()
+            else:
+                rpc.close()
+        except Exception:
+            pass
+
+    def close(self):
+        if self.rpc is not None:
+            self.close_rpc(self.rpc)
+            self.rpc = None
+        for watcher in self.watchers:
+            watcher.close()
+
+class InstanceLock:
+    """Keeps a second copy of the service from starting.
+
+    The running service holds an exclusive lock on service.lock for its whole
+    lifetime (the OS drops it if the process dies) and names itself in
+    service.pid: its PID on the first line, its control socket address on the
+    second.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.lock_path = self.directory / 'service.lock'
+        self.pid_path = self.directory / 'service.pid'
+        self.file = None
+
+    def acquire(self):
+        """True if this process now owns the lock, False if another instance holds it."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        f = open(self.lock_path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self.file = f
+        return True
+
+    def write_pid(self, control_address):
+        tmp_path = self.pid_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{os.getpid()}\n{control_address or ''}\n")
+        os.replace(tmp_path, self.pid_path)
+
+    def release(self):
+        if self.file is None:
+            return
+        try:
+            self.pid_path.unlink()
+        except OSError:
+            pass
+        # The lock file itself stays, unlinking it would let a new instance lock a different inode
+        self.file.close()
+        self.file = None
+
+def read_pid_file(path=None):
+    """(pid, control address) from a service.pid file (the running service's by default), (None, None) if there is none.
+
+    Also used by install.py and uninstall.py, so the format only lives here.
+    """
+    try:
+        lines = Path(path or DATA_DIR / 'service.pid').read_text(encoding='utf-8').split('\n')
+        return int(lines[0]), (lines[1] if len(lines) > 1 else '') or None
+    except (OSError, ValueError):
+        return None, None
+
+def sd_notify(state):
+    """Send a state such as READY=1 or STOPPING=1 to systemd; does nothing unless started as a Type=notify unit."""
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address or not hasattr(socket, 'AF_UNIX'):
+        return False
+    if address.startswith('@'):
+        # Abstract namespace socket
+        address = '\0' + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode('utf-8'))
+        return True
+    except OSError:
+        return False
+
+def control_request(address, command, timeout=5):
+    """Send one command line to a control socket, returns the decoded reply or None if nothing answered."""
+    kind, _, target = address.partition(':')
+    target, _, token = target.partition('#')
+    try:
+        if kind == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            host, _, port = target.rpartition(':')
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            target = (host, int(port))
+        with sock:
+            sock.settimeout(timeout)
+            sock.connect(target)
+            if token:
+                sock.sendall(token.encode('ascii') + b'\n')
+            sock.sendall(command.encode('utf-8') + b'\n')
+            with sock.makefile('rb') as reply:
+                return json.loads(reply.readline().decode('utf-8'))
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class ControlServer:
+    """Line-based control socket: one command per line in (a bare word or {"cmd": ...}),
+    one JSON object per line out, any number of commands per connection.
+
+    A Unix socket (owner-only) in directory where available, a loopback TCP port
+    otherwise. Any local user can connect to that port, so there the first line
+    has to be a random token, which only the address in service.pid carries
+    (tcp:127.0.0.1:port#token). handler(command, respond) runs on the server
+    thread and calls respond(reply) exactly once.
+    """
+
+    def __init__(self, handler, directory):
+        token = None if hasattr(socket, 'AF_UNIX') else os.urandom(16).hex()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                if token is not None and not hmac.compare_digest(self.rfile.readline().strip(), token.encode('ascii')):
+                    self.respond({'ok': False, 'error': "unauthorized"})
+                    return
+                for line in self.rfile:
+                    command = line.decode('utf-8', 'replace').strip()
+                    if command.startswith('{'):
+                        # JSON requests: {"cmd": "status"}
+                        try:
+                            command = str(json.loads(command).get('cmd', ''))
+                        except (ValueError, AttributeError):
+                            self.respond({'ok': False, 'error': "invalid JSON request"})
+                            continue
+                    if command:
+                        handler(command, self.respond)
+
+            def respond(self, reply):
+                try:
+                    self.wfile.write(json.dumps(reply, default=str).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+                except OSError:
+                    pass
+
+        self.path = None
+        if hasattr(socket, 'AF_UNIX'):
+            self.path = Path(directory) / 'control.sock'
+            try:
+                # Left over from an instance that died, we hold the instance lock so nobody else owns it
+                self.path.unlink()
+            except OSError:
+                pass
+            self.server = socketserver.ThreadingUnixStreamServer(str(self.path), Handler)
+            os.chmod(self.path, 0o600)
+            self.address = f"unix:{self.path}"
+        else:
+            self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+            self.address = f"tcp:127.0.0.1:{self.server.server_address[1]}#{token}"
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.path is not None:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+# Commands the control socket answers, each also available as a --<command> flag
+CONTROL_COMMANDS = ('status', 'probes', 'metrics', 'history', 'refresh', 'pause', 'resume', 'reload', 'stop')
+
+def control_main(command):
+    """--status, --stop etc.: talk to the running service instead of starting one."""
+    pid, address = read_pid_file()
+    reply = control_request(address, command) if address else None
+    if reply is None:
+        print("Ollama Discord Rich Presence is not running")
+        return 1
+    print(json.dumps(reply, indent=2))
+    if command == 'stop' and reply.get('ok'):
+        try:
+            psutil.Process(pid).wait(10)
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.TimeoutExpired:
+            print(f"PID {pid} is still running after 10 seconds")
+            return 1
+    return 0 if reply.get('ok') else 1
+
+def read_rss():
+    """Resident set size of this process in bytes, None if it can't be read."""
+    try:
+        # procfs where there is one, no psutil call needed
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+def trim_memory():
+    """Collect garbage and give freed heap pages back to the OS where the C library allows it (glibc)."""
+    gc.collect()
+    if sys.platform.startswith('linux'):
+        try:
+            ctypes.CDLL(None).malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+def read_boot_id():
+    try:
+        return Path('/proc/sys/kernel/random/boot_id').read_text().strip()
+    except OSError:
+        pass
+    try:
+        return str(int(psutil.boot_time()))
+    except Exception:
+        return None
+
+def read_gpu_driver_version():
+    """NVIDIA driver version from procfs; None where reading it would need a subprocess."""
+    try:
+        with open('/proc/driver/nvidia/version', 'r', encoding='utf-8') as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+def ollama_binary_stamp():
+    """[resolved path, inode, mtime] of the ollama binary on PATH, changes whenever Ollama is upgraded."""
+    path = shutil.which('ollama')
+    if not path:
+        return None
+    try:
+        real_path = os.path.realpath(path)
+        st = os.stat(real_path)
+        return [real_path, st.st_ino, st.st_mtime]
+    except OSError:
+        return None
+
+class OllamaVersionCache:
+    """Ollama version on disk, keyed on the binary's identity so it is only looked up again after an upgrade."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entry = None
+        self.loaded = False
+
+    def get(self):
+        if not self.loaded:
+            self.loaded = True
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entry = json.load(f)
+            except (OSError, ValueError):
+                self.entry = None
+        stamp = ollama_binary_stamp()
+        if stamp is None or not isinstance(self.entry, dict) or self.entry.get('binary') != stamp:
+            return None
+        return self.entry.get('version')
+
+    def save(self, version):
+        stamp = ollama_binary_stamp()
+        if stamp is None:
+            # No local binary (e.g. only remote hosts), nothing to key the version on
+            return
+        self.entry = {'binary': stamp, 'version': version}
+        self.loaded = True
+        try:
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entry, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+class HardwareCache:
+    """Hardware profile kept on disk, valid for one boot and one GPU driver."""
+
+    def __init__(self, path, ttl=86400):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.entry = None
+        self.loaded = False
+
+    def fingerprint(self):
+        return {
+            'boot_id': read_boot_id(),
+            'driver': read_gpu_driver_version()
+        }
+
+    def load(self):
+        """Return the cached profile, or None if it is missing, expired or from another boot/driver."""
+        if not self.loaded:
+            self.loaded = True
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entry = json.load(f)
+            except (OSError, ValueError):
+                self.entry = None
+        
+        entry = self.entry
+        if not isinstance(entry, dict) or not self.ttl or self.ttl <= 0:
+            return None
+        if time.time() - entry.get('saved_at', 0) > self.ttl:
+            return None
+        if entry.get('key') != self.fingerprint():
+            return None
+        return entry.get('profile')
+
+    def save(self, profile):
+        self.entry = {'key': self.fingerprint(), 'saved_at': time.time(), 'profile': profile}
+        self.loaded = True
+        try:
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entry, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+class GpuTelemetry:
+    """Live per-GPU VRAM, utilisation and temperature.
+
+    Uses NVML when the optional nvidia-ml-py package is installed, otherwise one
+    long-running `nvidia-smi --loop-ms` process whose output is read on a thread,
+    so taking a snapshot never spawns a process.
+    """
+
+    def __init__(self, logger, nvidia_smi='nvidia-smi', interval_ms=2000, metrics=None):
+        self.logger = logger
+        self.metrics = metrics
+        self.nvidia_smi = nvidia_smi
+        self.interval_ms = interval_ms
+        self.lock = threading.Lock()
+        self.devices = {}
+        self.proc = None
+        self.nvml = None
+        self.failed = False
+
+    @property
+    def active(self):
+        return self.nvml is not None or (self.proc is not None and self.proc.poll() is None)
+
+    def start(self):
+        if self.active or self.failed:
+            return self.active
+        if self.start_nvml() or self.start_stream():
+            return True
+        # No NVIDIA GPU/driver here, don't try again every time Ollama starts
+        self.failed = True
+        return False
+
+    def start_nvml(self):
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+        except Exception:
+            return False
+        self.nvml = pynvml
+        self.logger.info("GPU telemetry: using NVML")
+        return True
+
+    def start_stream(self):
+        cmd = shlex.split(self.nvidia_smi, posix=os.name != 'nt') + [
+            f'--query-gpu={NVIDIA_SMI_TELEMETRY_FIELDS}',
+            '--format=csv,noheader,nounits',
+            f'--loop-ms={self.interval_ms}'
+        ]
+        kwargs = {}
+        if platform.system() == 'Windows' and hasattr(subprocess, 'CREATE_NO_WINDOW'):
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        try:
+            self.proc = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                text=True, bufsize=1, **kwargs
+            )
+        except OSError:
+            self.proc = None
+            return False
+        finally:
+            if self.metrics:
+                self.metrics.inc('subprocess_spawns_total', command='nvidia-smi')
+        
+        threading.Thread(target=self.read_stream, args=(self.proc,), daemon=True).start()
+        self.logger.info(f"GPU telemetry: streaming nvidia-smi every {self.interval_ms}ms")
+        return True
+
+    def read_stream(self, proc):
+        for line in proc.stdout:
+            device = self.parse_line(line)
+            if device is not None:
+                with self.lock:
+                    self.devices[device['index']] = device
+        with self.lock:
+            if self.proc is proc:
+                self.devices.clear()
+
+    @staticmethod
+    def parse_line(line):
+        parts = [p.strip() for p in line.split(',')]
+        if len(parts) < 6 or not parts[0].isdigit():
+            return None
+        
+        def number(value):
+            try:
+                return int(float(value))
+            except ValueError:
+                return None  # e.g. [N/A] on cards that don't report a field
+        
+        return {
+            'index': int(parts[0]),
+            'name': parts[1],
+            'memory_used_mib': number(parts[2]),
+            'memory_total_mib': number(parts[3]),
+            'utilization': number(parts[4]),
+            'temperature': number(parts[5])
+        }
+
+    def read_nvml(self):
+        nvml = self.nvml
+        devices = []
+        try:
+            for index in range(nvml.nvmlDeviceGetCount()):
+                handle = nvml.nvmlDeviceGetHandleByIndex(index)
+                name = nvml.nvmlDeviceGetName(handle)
+                memory = nvml.nvmlDeviceGetMemoryInfo(handle)
+                devices.append({
+                    'index': index,
+                    'name': name.decode('utf-8') if isinstance(name, bytes) else name,
+                    'memory_used_mib': memory.used // (1024 * 1024),
+                    'memory_total_mib': memory.total // (1024 * 1024),
+                    'utilization': nvml.nvmlDeviceGetUtilizationRates(handle).gpu,
+                    'temperature': nvml.nvmlDeviceGetTemperature(handle, nvml.NVML_TEMPERATURE_GPU)
+                })
+        except Exception as e:
+            self.logger.error(f"NVML query failed: {e}")
+        return devices
+
+    def snapshot(self):
+        """Latest reading for every device, sorted by index; empty if telemetry isn't running."""
+        if self.nvml is not None:
+            return self.read_nvml()
+        with self.lock:
+            return [self.devices[index] for index in sorted(self.devices)]
+
+    def stop(self):
+        proc = self.proc
+        self.proc = None
+        if proc is not None:
+            try:
+                proc.terminate()
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+        if self.nvml is not None:
+            try:
+                self.nvml.nvmlShutdown()
+            except Exception:
+                pass
+            self.nvml = None
+        with self.lock:
+            self.devices.clear()
+
+class ThroughputTracker:
+    """Rolling tokens/sec and requests/min per model over the last `window` seconds."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self.evals = {}
+        self.requests = {}
+
+    def record(self, model, event, now=None):
+        now = time.monotonic() if now is None else now
+        if event[0] == 'eval':
+            self.evals.setdefault(model, deque()).append((now, event[1], event[2]))
+        else:
+            self.requests.setdefault(model, deque()).append(now)
+
+    def expire(self, now):
+        cutoff = now - self.window
+        for events in self.evals.values():
+            while events and events[0][0] < cutoff:
+                events.popleft()
+        for events in self.requests.values():
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def stats(self, model=None, now=None):
+        """{'tokens_per_sec', 'requests_per_min'} for model (all models if None), None when idle."""
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+        # Summed in place, this runs several times a tick
+        count = tokens = seconds = 0
+        for m, events in self.evals.items():
+            if model is None or m == model:
+                count += len(events)
+                for e in events:
+                    tokens += e[1]
+                    seconds += e[2]
+        requests = sum(len(events) for m, events in self.requests.items() if model is None or m == model)
+        if not count and not requests:
+            return None
+        return {
+            'tokens_per_sec': tokens / seconds if seconds else None,
+            'requests_per_min': requests * 60 / self.window
+        }
+
+class OllamaLogTail:
+    """Reads lines appended to the Ollama server log since the last call.
+
+    The read position is kept in offset_file so a restart resumes where it left
+    off instead of rereading the file; a rotated or truncated log starts over.
+    At most max_read bytes are read per call, a longer backlog is skipped down to
+    its last max_read bytes. written is the file's mtime at the last read.
+    """
+
+    def __init__(self, path, offset_file, save_interval=30, max_read=1024 * 1024):
+        self.path = Path(path)
+        self.offset_file = Path(offset_file)
+        self.save_interval = save_interval
+        self.max_read = max_read
+        self.inode = None
+        self.offset = None
+        self.partial = b''
+        self.written = None
+        self.last_save = time.monotonic()
+        self.load_offset()
+
+    def load_offset(self):
+        try:
+            with open(self.offset_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('path') == str(self.path):
+                self.inode = saved.get('inode')
+                self.offset = saved.get('offset')
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def save_offset(self):
+        if self.offset is None:
+            return
+        try:
+            with open(self.offset_file, 'w', encoding='utf-8') as f:
+                # A half-written last line is read again in full next time
+                json.dump({'path': str(self.path), 'inode': self.inode, 'offset': self.offset - len(self.partial)}, f)
+        except OSError:
+            pass
+        self.last_save = time.monotonic()
+
+    def read_lines(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if self.offset is None:
+            # First run: only what gets logged from now on is interesting
+            self.inode, self.offset = st.st_ino, st.st_size
+            self.save_offset()
+            return []
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.inode, self.offset, self.partial = st.st_ino, 0, b''
+        if st.st_size == self.offset:
+            return []
+        
+        skipped = st.st_size - self.offset > self.max_read
+        if skipped:
+            self.offset, self.partial = st.st_size - self.max_read, b''
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(st.st_size - self.offset)
+        except OSError:
+            return []
+        self.offset += len(data)
+        self.written = st.st_mtime
+        data = self.partial + data
+        lines = data.split(b'\n')
+        self.partial = lines.pop()
+        if skipped and lines:
+            # Starts mid-line
+            lines.pop(0)
+        if time.monotonic() - self.last_save >= self.save_interval:
+            self.save_offset()
+        return [line.decode('utf-8', 'replace') for line in lines]
+
+    def close(self):
+        self.save_offset()
+
+class OllamaJournalTail:
+    """Follows the ollama systemd unit's journal with one long-running journalctl, read on a thread."""
+
+    def __init__(self, unit='ollama', metrics=None):
+        self.unit = unit
+        self.metrics = metrics
+        self.lines = deque(maxlen=10000)
+        self.proc = None
+
+    def start(self):
+        try:
+            self.proc = subprocess.Popen(
+                ['journalctl', '-u', self.unit, '-f', '-n', '0', '-o', 'cat'],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                text=True, bufsize=1, errors='replace'
+            )
+        except OSError:
+            self.proc = None
+            return False
+        finally:
+            if self.metrics:
+                self.metrics.inc('subprocess_spawns_total', command='journalctl')
+        threading.Thread(target=self.read_stream, args=(self.proc,), daemon=True).start()
+        return True
+
+    def read_stream(self, proc):
+        for line in proc.stdout:
+            self.lines.append(line.rstrip('\n'))
+
+    def read_lines(self):
+        if self.proc is None and not self.start():
+            return []
+        lines = []
+        while self.lines:
+            lines.append(self.lines.popleft())
+        return lines
+
+    def close(self):
+        proc = self.proc
+        self.proc = None
+        if proc is not None:
+            try:
+                proc.terminate()
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+
+def ollama_log_source(setting, metrics=None):
+    """Pick where server log lines come from: ollamaLog path, 'journal', '' to disable, or None to auto-detect."""
+    if setting == '':
+        return None
+    if setting == 'journal':
+        return OllamaJournalTail(metrics=metrics)
+    if setting:
+        return OllamaLogTail(os.path.expanduser(setting), DATA_DIR / 'log_offset.json')
+    
+    if platform.system() == 'Windows':
+        path = Path(os.environ.get('LOCALAPPDATA', Path.home() / 'AppData' / 'Local')) / 'Ollama' / 'server.log'
+    else:
+        path = Path.home() / '.ollama' / 'logs' / 'server.log'
+    if path.exists():
+        return OllamaLogTail(path, DATA_DIR / 'log_offset.json')
+    systemd_units = ('/etc/systemd/system/ollama.service', '/usr/lib/systemd/system/ollama.service', '/lib/systemd/system/ollama.service')
+    if platform.system() == 'Linux' and shutil.which('journalctl') and any(os.path.exists(u) for u in systemd_units):
+        return OllamaJournalTail(metrics=metrics)
+    return None
+
+def week_start(now=None):
+    """Monday 00:00 local time of the current week, as a Unix timestamp."""
+    today = datetime.fromtimestamp(time.time() if now is None else now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today - timedelta(days=today.weekday())).timestamp()
+
+def local_day(ts):
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+
+class HistoryStore:
+    """Model load/unload intervals and usage samples in a small SQLite file.
+
+    Ticks only update what is kept in memory; everything since the last flush is
+    written in one transaction every flush_interval seconds. Raw rows older than
+    raw_days are folded into one row per day, host and model, so the file stays
+    small and "hours per model this week" reads two index ranges, not every poll.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS intervals (
+            id INTEGER PRIMARY KEY, host TEXT NOT NULL, model TEXT NOT NULL,
+            started REAL NOT NULL, ended REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS intervals_ended ON intervals (ended);
+        CREATE TABLE IF NOT EXISTS samples (
+            at REAL NOT NULL, host TEXT NOT NULL, model TEXT NOT NULL,
+            vram_mib REAL, tokens_per_sec REAL, requests_per_min REAL);
+        CREATE INDEX IF NOT EXISTS samples_at ON samples (at);
+        CREATE TABLE IF NOT EXISTS daily (
+            day TEXT NOT NULL, host TEXT NOT NULL, model TEXT NOT NULL,
+            seconds REAL NOT NULL DEFAULT 0, peak_vram_mib REAL, peak_tokens_per_sec REAL,
+            PRIMARY KEY (day, host, model)) WITHOUT ROWID;
+    '''
+
+    # A model not seen for this long (laptop asleep, service stopped) ended when it was last seen
+    MAX_GAP = 300
+
+    def __init__(self, path, flush_interval=60, raw_days=14):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.raw_days = raw_days
+        self.db = None
+        # (host, model) -> {'id', 'started', 'seen', 'flushed'}; 'flushed' is the end already on disk
+        self.loaded = {}
+        self.unloaded = []
+        self.samples = {}
+        self.last_flush = time.monotonic()
+        self.compacted_day = None
+
+    def connect(self):
+        if self.db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(str(self.path))
+            self.db.executescript(self.SCHEMA)
+        return self.db
+
+    def observe(self, models, activity=None, now=None):
+        """Record which models are loaded right now; models are the poll's model records (may be empty)."""
+        now = time.time() if now is None else now
+        seen = set()
+        for m in models:
+            if not m.get('model'):
+                continue
+            key = (m.get('host') or 'local', m['model'])
+            seen.add(key)
+            interval = self.loaded.get(key)
+            if interval is not None and now - interval['seen'] > self.MAX_GAP:
+                self.unloaded.append((key, self.loaded.pop(key)))
+                interval = None
+            if interval is None:
+                self.loaded[key] = {'id': None, 'started': now, 'seen': now, 'flushed': None}
+            else:
+                interval['seen'] = now
+            self.samples[key] = (
+                now,
+                m['size_vram'] / 1048576 if m.get('size_vram') else None,
+                activity['tokens_per_sec'] if activity else None,
+                activity['requests_per_min'] if activity else None
+            )
+        
+        for key in [key for key in self.loaded if key not in seen]:
+            interval = self.loaded.pop(key)
+            if now - interval['seen'] <= self.MAX_GAP:
+                interval['seen'] = now
+            self.unloaded.append((key, interval))
+
+    def flush_due(self):
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    def flush(self):
+        """Write everything observed since the last flush in one transaction; kept for the next try if that fails."""
+        self.last_flush = time.monotonic()
+        db = self.connect()
+        try:
+            with db:
+                for key, interval in self.unloaded + list(self.loaded.items()):
+                    if interval['flushed'] == interval['seen']:
+                        continue
+                    if interval['id'] is None:
+                        interval['id'] = db.execute(
+                            'INSERT INTO intervals (host, model, started, ended) VALUES (?, ?, ?, ?)',
+                            (key[0], key[1], interval['started'], interval['seen'])
+                        ).lastrowid
+                    else:
+                        db.execute('UPDATE intervals SET ended = ? WHERE id = ?', (interval['seen'], interval['id']))
+                db.executemany(
+                    'INSERT INTO samples (at, host, model, vram_mib, tokens_per_sec, requests_per_min) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(sample[0], key[0], key[1]) + sample[1:] for key, sample in self.samples.items()]
+                )
+        except sqlite3.Error:
+            for key, interval in self.unloaded + list(self.loaded.items()):
+                if interval['id'] is not None and interval['flushed'] is None:
+                    # The insert was rolled back with the rest
+                    interval['id'] = None
+            raise
+        for key, interval in self.unloaded + list(self.loaded.items()):
+            interval['flushed'] = interval['seen']
+        self.unloaded = []
+        self.samples = {}
+        
+        today = local_day(time.time())
+        if self.compacted_day != today:
+            self.compact()
+            self.compacted_day = today
+
+    def compact(self):
+        """Fold intervals and samples from before the raw_days window into the daily table."""
+        cutoff = datetime.fromtimestamp(time.time()).replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff = (cutoff - timedelta(days=self.raw_days)).timestamp()
+        db = self.connect()
+        with db:
+            daily = {}
+            for host, model, started, ended in db.execute('SELECT host, model, started, ended FROM intervals WHERE ended < ?', (cutoff,)):
+                # Split at local midnight so every day gets its own share
+                while started < ended:
+                    day_end = (datetime.fromtimestamp(started).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+                    row = daily.setdefault((local_day(started), host, model), [0, None, None])
+                    row[0] += min(ended, day_end) - started
+                    started = day_end
+            for at, host, model, vram_mib, tokens_per_sec in db.execute('SELECT at, host, model, vram_mib, tokens_per_sec FROM samples WHERE at < ?', (cutoff,)):
+                row = daily.setdefault((local_day(at), host, model), [0, None, None])
+                row[1] = max(row[1] or 0, vram_mib or 0) or None
+                row[2] = max(row[2] or 0, tokens_per_sec or 0) or None
+            # Merged in Python rather than with an upsert, which older SQLite builds lack
+            for key, row in daily.items():
+                existing = db.execute('SELECT seconds, peak_vram_mib, peak_tokens_per_sec FROM daily WHERE day = ? AND host = ? AND model = ?', key).fetchone()
+                if existing:
+                    row = [row[0] + existing[0], max(row[1] or 0, existing[1] or 0) or None, max(row[2] or 0, existing[2] or 0) or None]
+                db.execute('INSERT OR REPLACE INTO daily (day, host, model, seconds, peak_vram_mib, peak_tokens_per_sec) VALUES (?, ?, ?, ?, ?, ?)', key + tuple(row))
+            db.execute('DELETE FROM intervals WHERE ended < ?', (cutoff,))
+            db.execute('DELETE FROM samples WHERE at < ?', (cutoff,))
+
+    def model_seconds(self, since):
+        """{model: seconds loaded since the given timestamp}, summed over hosts, including what isn't flushed yet."""
+        totals = {}
+        db = self.connect()
+        for model, seconds in db.execute('SELECT model, sum(seconds) FROM daily WHERE day >= ? GROUP BY model', (local_day(since),)):
+            totals[model] = totals.get(model, 0) + seconds
+        query = 'SELECT model, sum(ended - max(started, ?)) FROM intervals WHERE ended >= ? GROUP BY model'
+        for model, seconds in db.execute(query, (since, since)):
+            totals[model] = totals.get(model, 0) + seconds
+        for (host, model), interval in self.unloaded + list(self.loaded.items()):
+            on_disk = interval['flushed'] if interval['flushed'] is not None else interval['started']
+            extra = interval['seen'] - max(on_disk, since)
+            if extra > 0:
+                totals[model] = totals.get(model, 0) + extra
+        return totals
+
+    def close(self):
+        try:
+            if self.loaded or self.unloaded or self.samples:
+                self.flush()
+        finally:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+def gpu_info_from_devices(devices, vendor=None):
+    """Build the gpu_info dict: first device's fields top-level, every device under 'devices'."""
+    devices = [d for d in devices if d.get('name')]
+    if not devices:
+        return dict(NO_GPU_INFO)
+    for device in devices:
+        device['vram_str'] = f"{device['vram_mib']}MiB" if device.get('vram_mib') else None
+        if vendor:
+            device['vendor'] = vendor
+    return {**devices[0], 'devices': devices}
+
+def drm_devices():
+    """(device dir, vendor id) for every GPU under /sys/class/drm, skipping connector entries."""
+    devices = []
+    for card in sorted(Path('/sys/class/drm').glob('card[0-9]*')):
+        if '-' in card.name:
+            continue
+        try:
+            vendor = (card / 'device' / 'vendor').read_text().strip().lower()
+        except OSError:
+            continue
+        devices.append((card / 'device', vendor))
+    return devices
+
+def read_sysfs(path):
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+class GpuProbe:
+    """One way of reading the GPU name and VRAM.
+
+    cost is the relative price of a read (file read < library call < subprocess);
+    GpuProbeRegistry tries supported probes cheapest first.
+    """
+
+    name = 'gpu'
+    vendor = None
+    cost = 100
+
+    def supported(self, service):
+        """Cheap check that doesn't spawn anything."""
+        return True
+
+    def read(self, service):
+        return None
+
+    async def read_async(self, service):
+        return self.read(service)
+
+class CommandGpuProbe(GpuProbe):
+    """Probe backed by a command line tool, shares run_command/run_command_async with the service."""
+
+    def command(self, service):
+        raise NotImplementedError
+
+    def parse(self, stdout):
+        raise NotImplementedError
+
+    def read(self, service):
+        result = service.run_command(self.command(service))
+        if result['ok'] and result['stdout'].strip():
+            return self.parse(result['stdout'])
+        return None
+
+    async def read_async(self, service):
+        result = await service.run_command_async(self.command(service))
+        if result['ok'] and result['stdout'].strip():
+            return self.parse(result['stdout'])
+        return None
+
+class SysfsGpuProbe(GpuProbe):
+    """Reads /sys/class/drm on Linux, no process needed.
+
+    vendor_id None matches any GPU. With only_gpu the probe steps aside when a GPU
+    from another vendor is present, so an integrated GPU never hides the discrete one;
+    defer_to does the same for just the listed vendors (an AMD APU next to an NVIDIA card).
+    """
+
+    cost = 1
+
+    def __init__(self, name, vendor_id=None, cost=1, only_gpu=False, defer_to=()):
+        self.name = name
+        self.vendor_id = vendor_id
+        self.vendor = PCI_VENDORS[vendor_id][0] if vendor_id else None
+        self.cost = cost
+        self.only_gpu = only_gpu
+        self.defer_to = set(defer_to)
+
+    def matching(self):
+        return [(path, vendor) for path, vendor in drm_devices() if self.vendor_id in (None, vendor)]
+
+    def supported(self, service):
+        if platform.system() != 'Linux':
+            return False
+        vendors = {vendor for path, vendor in drm_devices()}
+        if self.only_gpu and vendors - {self.vendor_id}:
+            return False
+        if vendors & self.defer_to:
+            return False
+        return self.vendor_id in vendors or (self.vendor_id is None and bool(vendors))
+
+    def read(self, service):
+        devices = []
+        for path, vendor in self.matching():
+            vendor_name, label = PCI_VENDORS.get(vendor, ('gpu', 'GPU'))
+            vram_bytes = read_sysfs(path / 'mem_info_vram_total')
+            devices.append({
+                'name': read_sysfs(path / 'product_name') or f"{label} [{read_sysfs(path / 'device') or '?'}]",
+                'vram_mib': int(vram_bytes) // (1024 * 1024) if vram_bytes and vram_bytes.isdigit() else None,
+                'vendor': vendor_name
+            })
+        return gpu_info_from_devices(devices, self.vendor)
+
+class NvmlGpuProbe(GpuProbe):
+    name = 'nvml'
+    vendor = 'nvidia'
+    cost = 2
+
+    def supported(self, service):
+        try:
+            import pynvml
+            return True
+        except ImportError:
+            return False
+
+    def read(self, service):
+        import pynvml
+        try:
+            pynvml.nvmlInit()
+        except Exception:
+            return None
+        try:
+            devices = []
+            for index in range(pynvml.nvmlDeviceGetCount()):
+                handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+                name = pynvml.nvmlDeviceGetName(handle)
+                devices.append({
+                    'name': name.decode('utf-8') if isinstance(name, bytes) else name,
+                    'vram_mib': pynvml.nvmlDeviceGetMemoryInfo(handle).total // (1024 * 1024)
+                })
+            return gpu_info_from_devices(devices, self.vendor)
+        finally:
+            pynvml.nvmlShutdown()
+
+class NvidiaSmiGpuProbe(CommandGpuProbe):
+    name = 'nvidia-smi'
+    vendor = 'nvidia'
+    cost = 10
+
+    def supported(self, service):
+        executable = shlex.split(service.nvidia_smi, posix=os.name != 'nt')[0]
+        return shutil.which(executable) is not None
+
+    def command(self, service):
+        return f"{service.nvidia_smi} {NVIDIA_SMI_QUERY_ARGS}"
+
+    def parse(self, stdout):
+        devices = []
+        for line in stdout.strip().split('\n'):
+            parts = [p.strip() for p in line.split(',')]
+            vram_mib = None
+            if len(parts) >= 2:
+                try:
+                    vram_mib = int(''.join(filter(str.isdigit, parts[1])))
+                except ValueError:
+                    pass
+            devices.append({'name': parts[0], 'vram_mib': vram_mib})
+        return gpu_info_from_devices(devices, self.vendor)
+
+class RocmSmiGpuProbe(CommandGpuProbe):
+    name = 'rocm-smi'
+    vendor = 'amd'
+    cost = 10
+
+    def supported(self, service):
+        return shutil.which('rocm-smi') is not None
+
+    def command(self, service):
+        return ROCM_SMI_QUERY
+
+    def parse(self, stdout):
+        try:
+            cards = json.loads(stdout)
+        except ValueError:
+            return None
+        devices = []
+        for key in sorted(cards):
+            card = cards[key]
+            if not key.startswith('card') or not isinstance(card, dict):
+                continue
+            vram_bytes = str(card.get('VRAM Total Memory (B)', ''))
+            devices.append({
+                'name': card.get('Card series') or card.get('Card model') or 'AMD Radeon',
+                'vram_mib': int(vram_bytes) // (1024 * 1024) if vram_bytes.isdigit() else None
+            })
+        return gpu_info_from_devices(devices, self.vendor)
+
+class WmicGpuProbe(CommandGpuProbe):
+    name = 'wmic'
+    cost = 20
+
+    def supported(self, service):
+        return platform.system() == 'Windows'
+
+    def command(self, service):
+        return WMIC_GPU_QUERY
+
+    def parse(self, stdout):
+        # /format:list prints one Key=Value block per adapter; a repeated key starts the next adapter
+        records = [{}]
+        for line in stdout.split('\n'):
+            key, sep, value = line.strip().partition('=')
+            if not sep:
+                continue
+            if key in records[-1]:
+                records.append({})
+            records[-1][key] = value
+        
+        devices = []
+        for record in records:
+            try:
+                vram_mib = round(int(record.get('AdapterRAM', '')) / 1024 / 1024) or None
+            except ValueError:
+                vram_mib = None
+            devices.append({'name': record.get('Name'), 'vram_mib': vram_mib})
+        return gpu_info_from_devices(devices)
+
+class GpuProbeRegistry:
+    """Picks the cheapest GPU probe that works on this machine and sticks with it."""
+
+    def __init__(self, probes, logger):
+        self.probes = sorted(probes, key=lambda probe: probe.cost)
+        self.logger = logger
+        self.selected = None
+        self.exhausted = False
+
+    @classmethod
+    def default(cls, logger):
+        return cls([
+            SysfsGpuProbe('sysfs-amd', '0x1002', defer_to=['0x10de']),
+            SysfsGpuProbe('sysfs-intel', '0x8086', only_gpu=True),
+            NvmlGpuProbe(),
+            NvidiaSmiGpuProbe(),
+            RocmSmiGpuProbe(),
+            WmicGpuProbe(),
+            SysfsGpuProbe('sysfs-drm', None, cost=30)
+        ], logger)
+
+    def prefer(self, name):
+        """Reuse a choice remembered from an earlier run (e.g. the hardware cache)."""
+        for probe in self.probes:
+            if probe.name == name:
+                self.selected = probe
+
+    def candidates(self, service):
+        if self.selected is not None:
+            yield self.selected
+        for probe in self.probes:
+            if probe is not self.selected and probe.supported(service):
+                yield probe
+
+    def accept(self, probe, info):
+        if not info or not info.get('name'):
+            return False
+        if probe is not self.selected:
+            self.logger.info(f"GPU probe selected: {probe.name} (cost {probe.cost})")
+            self.selected = probe
+        return True
+
+    def read(self, service):
+        if self.exhausted:
+            return dict(NO_GPU_INFO)
+        for probe in self.candidates(service):
+            info = probe.read(service)
+            if self.accept(probe, info):
+                return info
+        return self.give_up()
+
+    async def read_async(self, service):
+        if self.exhausted:
+            return dict(NO_GPU_INFO)
+        for probe in self.candidates(service):
+            info = await probe.read_async(service)
+            if self.accept(probe, info):
+                return info
+        return self.give_up()
+
+    def give_up(self):
+        self.logger.info("No GPU probe found a GPU")
+        self.selected = None
+        self.exhausted = True
+        return dict(NO_GPU_INFO)
+
+class AdaptivePollScheduler:
+    """Polls quickly right after a state change and backs off exponentially while nothing changes."""
+
+    def __init__(self, min_interval=2, max_interval=30, factor=2):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.factor = factor
+        self.interval = min_interval
+        self.last_state = None
+
+    def next_interval(self, state):
+        if state != self.last_state:
+            self.last_state = state
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.factor, self.max_interval)
+        return self.interval
+
+class OllamaDiscordService:
+    def __init__(self):
+        self.config = self.load_config()
+        # Invalid values would break logging setup itself, so they are reported once the logger exists
+        errors = validate_config(self.config)
+        defaults = self.default_config()
+        for key in errors:
+            if key in defaults:
+                self.config[key] = defaults[key]
+            else:
+                del self.config[key]
+        self.setup_logging()
+        for key, problem in errors.items():
+            self.logger.warning(f"Ignoring invalid config value {key} ({problem}), using the default")
+        self.metrics = ServiceMetrics()
+        self.metrics_server = None
+        self.profiler = None
+        self.client_id = self.config.get('clientId', '1408133296000466945')
+        self.async_mode = '--async' in sys.argv or self.config.get('asyncMode', False)
+        # leanMode trades a little CPU for a smaller resident footprint, see sample_memory
+        self.lean = '--lean' in sys.argv or self.config.get('leanMode', False)
+        self.rss_peak = 0
+        self.next_memory_sample = 0
+        
+        self.scheduler = AdaptivePollScheduler(
+            self.config.get('pollIntervalMin', 2),
+            self.config.get('pollIntervalMax', 30)
+        )
+        self.auto_start = self.config.get('autoStart', True)
+        self.supervise = self.config.get('superviseOllama', False)
+        self.ollama_start_timeout = self.config.get('ollamaStartTimeout', 30)
+        self.ollama_proc = None
+        self.next_ollama_start = 0
+        self.auto_exit = self.config.get('autoExit', True)
+        self.auto_exit_after = self.config.get('autoExitAfter', 60)
+        self.ollama_cmd = self.config.get('ollamaCmd', 'ollama ps')
+        
+        ollama_host, ollama_port = parse_ollama_host(self.config.get('ollamaHost'))
+        self.api = (LeanOllamaApiClient if self.lean else OllamaApiClient)(ollama_host, ollama_port, metrics=self.metrics)
+        self.liveness = OllamaLivenessTracker(ollama_host, ollama_port, self.logger, lean=self.lean)
+        self.ollama_running = None
+        self.local_running = None
+        
+        remote = [e for e in parse_ollama_hosts(self.config.get('ollamaHosts')) if (e['host'], e['port']) != (ollama_host, ollama_port)]
+        self.hosts = OllamaHostPool(remote, self.logger, self.metrics, self.config.get('ollamaHostsWait', 1)) if remote else None
+        
+        self.gpu_info = None
+        self.ram_info = None
+        self.ollama_version = None
+        self.nvidia_smi = self.config.get('nvidiaSmi', 'nvidia-smi')
+        self.telemetry = None
+        if self.config.get('gpuTelemetry', True):
+            self.telemetry = GpuTelemetry(self.logger, self.nvidia_smi, self.config.get('gpuTelemetryInterval', 2000), self.metrics)
+        self.gpu_probes = GpuProbeRegistry.default(self.logger)
+        self.hardware_cache = HardwareCache(DATA_DIR / 'hardware.json', self.config.get('hardwareCacheTtl', 86400))
+        self.version_cache = OllamaVersionCache(DATA_DIR / 'version.json')
+        self.presence_active = False
+        self.was_running = None
+        self.current_model = None
+        self.rpc = None
+        self.publisher = PresencePublisher(metrics=self.metrics)
+        # presenceRotate: seconds per model when several are loaded, 0 shows only the first
+        rotate = self.config.get('presenceRotate', 0)
+        self.rotate_interval = max(rotate, 5) if rotate else 0
+        self.rotation = 0
+        self.throughput = ThroughputTracker(self.config.get('throughputWindow', 60))
+        self.log_source = ollama_log_source(self.config.get('ollamaLog'), self.metrics)
+        # The pypresence-free client is blocking, async mode keeps AioPresence
+        self.discord = DiscordConnection(self.client_id, self.logger, self.metrics, max_backoff=self.config.get('discordReconnectMax', 60), lean=self.lean and not self.async_mode)
+        self.history = self.create_history(self.config)
+        self.week_usage = None
+        
+        self.loop = None
+        self.api_async = None
+        self.tasks = {}
+        self.probe_wakeups = {}
+        self.stopped_since = None
+        self.instance = InstanceLock(DATA_DIR)
+        self.control_server = None
+        self.control_calls = queue.SimpleQueue() if hasattr(queue, 'SimpleQueue') else queue.Queue()
+        self.wake_socket = None
+        self.wake_sender = None
+        self.stop_requested = False
+        self.notified_ready = False
+        # Async mode: probes whose first run completes the first poll/presence cycle
+        self.ready_probes = set()
+        self.paused = False
+        self.throughput_stats = None
+        self.started_at = time.monotonic()
+        # IN_CLOSE_WRITE catches editors that rewrite in place, IN_MOVED_TO the ones that rename a temp file over it
+        self.config_watcher = DirectoryWatcher(CONFIG_PATH.parent, CONFIG_PATH.name, DirectoryWatcher.DEFAULT_MASK | DirectoryWatcher.IN_CLOSE_WRITE, poll_path=CONFIG_PATH)
+        
+    def setup_logging(self):
+        log_dir = DATA_DIR
+        log_dir.mkdir(parents=True, exist_ok=True)
+        
+        log_file = log_dir / 'logs.txt'
+        debug = '--debug' in sys.argv
+        
+        # Size-capped log, written by a QueueListener thread so the poll loop never waits on disk
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=self.config.get('logMaxBytes', 1024 * 1024),
+            backupCount=self.config.get('logBackupCount', 3),
+            encoding='utf-8'
+        )
+        handlers = [file_handler]
+        if debug:
+            handlers.append(logging.StreamHandler())
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        log_queue = queue.SimpleQueue() if hasattr(queue, 'SimpleQueue') else queue.Queue()
+        self.log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+        self.log_listener.start()
+        atexit.register(self.log_listener.stop)
+        
+        level = logging.DEBUG if debug else getattr(logging, str(self.config.get('logLevel', 'INFO')).upper(), logging.INFO)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        logging.basicConfig(level=level, handlers=[queue_handler])
+        self.logger = logging.getLogger(__name__)
+        self.logged_state = {}
+
+    def log_change(self, key, value, message, level=logging.INFO):
+        """Log only when value differs from what was last logged for key, so steady state stays quiet."""
+        if self.logged_state.get(key, object()) != value:
+            self.logged_state[key] = value
+            self.logger.log(level, message)
+        
+    @staticmethod
+    def default_config():
+        return {
+            "clientId": "1408133296000466945",
+            "largeImageKey": "ollama",
+            "autoStart": True,
+            "autoExit": True,
+            "ollamaCmd": "ollama ps",
+            "ollamaHost": os.environ.get('OLLAMA_HOST') or DEFAULT_OLLAMA_HOST,
+            "asyncMode": False,
+            "pollIntervalMin": 2,
+            "pollIntervalMax": 30,
+            "autoExitAfter": 60,
+            "hardwareCacheTtl": 86400,
+            "nvidiaSmi": "nvidia-smi",
+            "gpuTelemetry": True,
+            "gpuTelemetryInterval": 2000,
+            "logLevel": "INFO",
+            "logMaxBytes": 1048576,
+            "logBackupCount": 3,
+            "metricsPort": 0,
+            "discordReconnectMax": 60,
+            "history": True
+        }
+
+    def load_config(self):
+        default_config = self.default_config()
+        try:
+            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+                return {**default_config, **config}
+        except FileNotFoundError:
+            CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+                # ollamaHost left out so OLLAMA_HOST keeps deciding it on later starts
+                json.dump({key: value for key, value in default_config.items() if key != 'ollamaHost'}, f, indent=2)
+            return default_config
+
+    def check_config(self):
+        """Reload config.json if it changed on disk, cheap enough to call every tick."""
+        if self.config_watcher.changed():
+            self.reload_config()
+
+    def reload_config(self):
+        """Validate the new config.json and apply it in one go, or keep running on the old one.
+
+        Returns the changed keys, None if the new config was rejected.
+        """
+        try:
+            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+                config = {**self.default_config(), **json.load(f)}
+        except (OSError, ValueError, TypeError) as e:
+            # Also hit while an editor is halfway through writing the file, the finished write triggers another reload
+            self.logger.error(f"Config reload failed, keeping the current config: {e}")
+            return None
+        
+        errors = validate_config(config)
+        if errors:
+            problems = '; '.join(f"{key}: {problem}" for key, problem in errors.items())
+            self.logger.error(f"Config reload rejected, keeping the current config: {problems}")
+            return None
+        
+        changed = {key for key in set(config) | set(self.config) if config.get(key) != self.config.get(key)}
+        if not changed:
+            return []
+        
+        try:
+            self.apply_config(config, changed)
+        except Exception as e:
+            self.logger.error(f"Config reload failed, keeping the current config: {e}")
+            return None
+        
+        self.logger.info(f"Config reloaded: {', '.join(sorted(changed))} changed")
+        restart = changed & CONFIG_RESTART_KEYS
+        if restart:
+            self.logger.warning(f"{', '.join(sorted(restart))} only take effect after a restart")
+        self.metrics.inc('config_reloads_total')
+        return sorted(changed)
+
+    def apply_config(self, config, changed):
+        """Swap in the subsystems whose settings changed; everything else keeps its caches and connections.
+
+        Replacements are all built before anything is swapped, so a failure leaves the
+        running service untouched.
+        """
+        built = {}
+        ollama_host, ollama_port = parse_ollama_host(config.get('ollamaHost'))
+        if 'ollamaHost' in changed:
+            built['api'] = (LeanOllamaApiClient if self.lean else OllamaApiClient)(ollama_host, ollama_port, metrics=self.metrics)
+            built['liveness'] = OllamaLivenessTracker(ollama_host, ollama_port, self.logger, lean=self.lean)
+        if changed & {'ollamaHost', 'ollamaHosts', 'ollamaHostsWait'}:
+            remote = [e for e in parse_ollama_hosts(config.get('ollamaHosts')) if (e['host'], e['port']) != (ollama_host, ollama_port)]
+            built['hosts'] = OllamaHostPool(remote, self.logger, self.metrics, config.get('ollamaHostsWait', 1)) if remote else None
+        if changed & {'nvidiaSmi', 'gpuTelemetry', 'gpuTelemetryInterval'}:
+            built['telemetry'] = GpuTelemetry(self.logger, config.get('nvidiaSmi', 'nvidia-smi'), config.get('gpuTelemetryInterval', 2000), self.metrics) if config.get('gpuTelemetry', True) else None
+        if 'ollamaLog' in changed:
+            built['log_source'] = ollama_log_source(config.get('ollamaLog'), self.metrics)
+        if 'history' in changed:
+            built['history'] = self.create_history(config)
+        if 'clientId' in changed:
+            built['discord'] = DiscordConnection(config.get('clientId'), self.logger, self.metrics, max_backoff=config.get('discordReconnectMax', 60), lean=self.discord.lean)
+        
+        # Nothing below can fail half-way: plain assignments and closing what was replaced
+        self.config = config
+        self.auto_start = config.get('autoStart', True)
+        self.supervise = config.get('superviseOllama', False)
+        self.ollama_start_timeout = config.get('ollamaStartTimeout', 30)
+        self.auto_exit = config.get('autoExit', True)
+        self.auto_exit_after = config.get('autoExitAfter', 60)
+        self.ollama_cmd = config.get('ollamaCmd', 'ollama ps')
+        self.nvidia_smi = config.get('nvidiaSmi', 'nvidia-smi')
+        rotate = config.get('presenceRotate', 0)
+        self.rotate_interval = max(rotate, 5) if rotate else 0
+        self.throughput.window = config.get('throughputWindow', 60)
+        self.hardware_cache.ttl = config.get('hardwareCacheTtl', 86400)
+        self.discord.max_backoff = max(self.discord.min_backoff, config.get('discordReconnectMax', 60))
+        if self.history is not None:
+            self.history.flush_interval = config.get('historyFlushInterval', 60)
+            self.history.raw_days = config.get('historyRawDays', 14)
+        if changed & {'pollIntervalMin', 'pollIntervalMax'}:
+            self.scheduler = AdaptivePollScheduler(config.get('pollIntervalMin', 2), config.get('pollIntervalMax', 30))
+        if 'logLevel' in changed and '--debug' not in sys.argv:
+            logging.getLogger().setLevel(getattr(logging, config['logLevel'].upper()))
+        
+        if 'api' in built:
+            self.api.close()
+            self.api, self.liveness = built['api'], built['liveness']
+            if self.api_async is not None:
+                self.api_async.close()
+                self.api_async = AsyncOllamaApiClient(self.api.host, self.api.port, self.api.timeout, self.metrics)
+        if 'hosts' in built:
+            if self.hosts:
+                self.hosts.close()
+            self.hosts = built['hosts']
+        if 'telemetry' in built:
+            self.stop_telemetry()
+            self.telemetry = built['telemetry']
+            if self.ollama_running:
+                self.start_telemetry()
+        if 'log_source' in built:
+            if self.log_source:
+                self.log_source.close()
+            self.log_source = built['log_source']
+        if 'history' in built:
+            self.close_history()
+            self.history = built['history']
+            self.week_usage = None
+        if 'discord' in built:
+            self.unwatch_discord_ipc()
+            self.discord.close()
+            self.discord = built['discord']
+            self.client_id = config.get('clientId')
+            self.rpc = self.publisher.rpc = None
+            self.presence_active = False
+            self.watch_discord_ipc()
+        if 'metricsPort' in changed:
+            if self.metrics_server is not None:
+                self.metrics_server.close()
+                self.metrics_server = None
+            self.start_metrics_server()
+        if self.loop is not None and changed & {'superviseOllama', 'ollamaStartTimeout', 'presenceRotate'}:
+            self.schedule_optional_probes()
+
+    def count_spawn(self, cmd):
+        self.metrics.inc('subprocess_spawns_total', command=cmd.split()[0] if cmd.split() else cmd)
+
+    def run_command(self, cmd, timeout=10):
+        self.count_spawn(cmd)
+        try:
+            if platform.system() == 'Windows':
+                result = subprocess.run(
+                    cmd, shell=True, capture_output=True, text=True, timeout=timeout,
+                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+                )
+            else:
+                result = subprocess.run(
+                    cmd, shell=True, capture_output=True, text=True, timeout=timeout
+                )
+            
+            return {
+                'ok': result.returncode == 0,
+                'stdout': result.stdout.strip() if result.stdout else '',
+                'stderr': result.stderr.strip() if result.stderr else ''
+            }
+        except subprocess.TimeoutExpired:
+            return {'ok': False, 'stdout': '', 'stderr': 'Command timeout'}
+        except Exception as e:
+            return {'ok': False, 'stdout': '', 'stderr': str(e)}
+
+    async def run_command_async(self, cmd, timeout=10):
+        """Same result shape as run_command, without blocking the event loop."""
+        self.count_spawn(cmd)
+        kwargs = {}
+        if platform.system() == 'Windows' and hasattr(subprocess, 'CREATE_NO_WINDOW'):
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, **kwargs
+            )
+        except Exception as e:
+            return {'ok': False, 'stdout': '', 'stderr': str(e)}
+        
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return {'ok': False, 'stdout': '', 'stderr': 'Command timeout'}
+        
+        return {
+            'ok': proc.returncode == 0,
+            'stdout': stdout.decode('utf-8', 'replace').strip(),
+            'stderr': stderr.decode('utf-8', 'replace').strip()
+        }
+
+    def is_ollama_running(self):
+        """Check if Ollama (locally or on any ollamaHosts entry) is running and cache the result for the rest of the tick."""
+        try:
+            with self.metrics.timer('liveness'):
+                self.local_running = self.liveness.check()
+        except Exception as e:
+            self.logger.error(f"Exception checking Ollama: {e}")
+            self.local_running = False
+        
+        self.ollama_running = self.local_running
+        if self.hosts:
+            with self.metrics.timer('hosts'):
+                self.hosts.poll()
+            self.ollama_running = self.local_running or self.hosts.reachable()
+        return self.ollama_running
+
+    def get_ollama_model(self):
+        """Get the loaded models from the Ollama API, falling back to the CLI if the API is unreachable."""
+        with self.metrics.timer('model'):
+            return self.read_ollama_model()
+
+    def read_ollama_model(self):
+        if self.hosts is None:
+            return self.read_local_model()
+        return self.merge_host_models(self.read_local_model() if self.local_running else None)
+
+    def read_local_model(self):
+        models = self.api.ps()
+        self.log_api_state(models is not None)
+        if models is None:
+            return self.get_ollama_model_cli()
+        
+        if not models:
+            return None
+        
+        return {**models[0], 'models': models}
+
+    def merge_host_models(self, local):
+        """Combine the local result with the models of every reachable remote host."""
+        models = [{**m, 'host': 'local'} for m in (local.get('models') or [local])] if local else []
+        models.extend(self.hosts.models())
+        if not models:
+            return None
+        return {**models[0], 'models': models, 'hosts': len({m['host'] for m in models})}
+
+    def log_api_state(self, reachable):
+        if reachable:
+            self.log_change('api', True, "Ollama API reachable")
+        else:
+            self.log_change('api', False, "Ollama API unreachable, falling back to CLI", logging.WARNING)
+
+    def get_ollama_model_cli(self):
+        result = self.run_command(self.ollama_cmd)
+        if not result['ok'] or not result['stdout']:
+            return None
+        
+        return self.parse_ollama_ps(result['stdout'])
+
+    def parse_ollama_ps(self, stdout):
+        models = parse_ps_table(stdout)
+        if not models:
+            return None
+        
+        return {**models[0], 'models': models}
+
+    def get_ollama_version(self):
+        """Version cached for this ollama binary, else /api/version, else `ollama --version`."""
+        version = self.version_cache.get()
+        if version:
+            return version
+        
+        with self.metrics.timer('version'):
+            version = self.api.version()
+            if version is None:
+                result = self.run_command('ollama --version')
+                if result['ok'] and result['stdout']:
+                    version = self.parse_ollama_version(result['stdout'])
+        if version:
+            self.version_cache.save(version)
+        return version
+
+    def parse_ollama_version(self, stdout):
+        stdout = stdout.strip()
+        for pattern in VERSION_PATTERNS:
+            match = pattern.search(stdout)
+            if match:
+                return match.group(1).strip()
+        
+        return stdout.split('\n')[0] if stdout else 'unknown'
+
+    def start_ollama(self):
+        """Launch `ollama serve` and wait until its API answers, returns True once it is ready."""
+        if not self.auto_start:
+            return False
+        
+        kwargs = {}
+        if platform.system() == 'Windows' and hasattr(subprocess, 'CREATE_NO_WINDOW'):
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        env = dict(os.environ, OLLAMA_HOST=f"{self.api.host}:{self.api.port}")
+        started = time.monotonic()
+        try:
+            proc = subprocess.Popen(
+                ['ollama', 'serve'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL, env=env, **kwargs
+            )
+        except OSError as e:
+            self.logger.error(f"Failed to start Ollama: {e}")
+            return False
+        finally:
+            self.metrics.inc('subprocess_spawns_total', command='ollama')
+        
+        self.ollama_proc = proc
+        # Liveness follows our child directly instead of scanning for it
+        self.liveness.watch(proc.pid)
+        if not self.wait_until_ready(proc, started + self.ollama_start_timeout):
+            return False
+        
+        elapsed = time.monotonic() - started
+        self.metrics.observe('ollama_start', elapsed)
+        self.logger.info(f"Started Ollama (PID {proc.pid}), ready after {elapsed:.2f}s")
+        return True
+
+    def wait_until_ready(self, proc, deadline):
+        """Probe the port, then /api/version, with a short growing delay until deadline."""
+        delay = 0.05
+        while True:
+            if proc.poll() is not None:
+                self.logger.error(f"ollama serve exited with code {proc.returncode} before it was ready")
+                return False
+            if self.liveness.port_open() and self.api.version() is not None:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.error(f"Ollama not ready after {self.ollama_start_timeout}s, leaving PID {proc.pid} running")
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+
+    def supervise_ollama(self):
+        """superviseOllama: start `ollama serve` when it isn't running, at most once every 30 seconds."""
+        if not self.supervise or time.monotonic() < self.next_ollama_start:
+            return False
+        self.next_ollama_start = time.monotonic() + 30
+        return self.start_ollama()
+
+    def refresh_hardware_info(self):
+        """Refresh hardware info - served from the hardware cache while it is valid, get Ollama version only if running."""
+        cached = self.hardware_cache.load()
+        if cached:
+            self.gpu_info = cached.get('gpu_info')
+            self.ram_info = cached.get('ram_info')
+            self.gpu_probes.prefer(cached.get('gpu_probe'))
+        else:
+            self.gpu_info = self.get_gpu_info()
+            self.ram_info = self.get_ram_info()
+        
+        # Only get Ollama version if we know Ollama is running (to avoid auto-starting it)
+        running = self.ollama_running if self.ollama_running is not None else self.is_ollama_running()
+        if running:
+            self.ollama_version = self.get_ollama_version()
+        else:
+            self.ollama_version = 'unknown'
+        
+        if not cached:
+            self.save_hardware_cache()
+            
+        gpu_name = self.gpu_info.get('name', 'unknown') if self.gpu_info else 'unknown'
+        ram_gb = self.ram_info.get('total_gb', 'unknown') if self.ram_info else 'unknown'
+        source = "cache" if cached else "probe"
+        self.logger.info(f"Hardware refreshed from {source}: GPU={gpu_name}, RAM={ram_gb}GB, Version={self.ollama_version}")
+
+    def save_hardware_cache(self):
+        self.hardware_cache.save({
+            'gpu_info': self.gpu_info,
+            'ram_info': self.ram_info,
+            'gpu_probe': self.gpu_probes.selected.name if self.gpu_probes.selected else None
+        })
+
+    def get_gpu_info(self):
+        """Get GPU info - safe, doesn't interact with Ollama."""
+        with self.metrics.timer('gpu'):
+            return self.gpu_probes.read(self)
+
+    async def get_gpu_info_async(self):
+        return await self.gpu_probes.read_async(self)
+
+    def get_ram_info(self):
+        """Get RAM info - safe, doesn't interact with Ollama."""
+        try:
+            memory = psutil.virtual_memory()
+            total_gb = round(memory.total / 1024 / 1024 / 1024)
+            return {'total_gb': total_gb}
+        except:
+            return {'total_gb': None}
+
+    def get_gpu_brand(self):
+        """Get GPU brand - safe, doesn't interact with Ollama."""
+        if not self.gpu_info or not self.gpu_info.get('name'):
+            return 'gpu'
+        if self.gpu_info.get('vendor'):
+            return self.gpu_info['vendor']
+        
+        gpu_name = self.gpu_info['name'].lower()
+        
+        if any(keyword in gpu_name for keyword in ['nvidia', 'geforce', 'rtx', 'gtx']):
+            return 'nvidia'
+        elif any(keyword in gpu_name for keyword in ['amd', 'radeon', 'rx']):
+            return 'amd'
+        elif any(keyword in gpu_name for keyword in ['intel', 'iris', 'uhd']):
+            return 'intel'
+        else:
+            return 'gpu'
+
+    def build_presence_payload(self, model_obj):
+        model_name = model_obj.get('model', 'none') if model_obj else 'none'
+        details = f"MODEL: {model_name}"
+        session_key = model_obj and model_name
+        activity = self.throughput.stats()
+        if self.rotating(model_obj):
+            models = model_obj['models']
+            index = self.rotation % len(models)
+            shown = models[index]
+            host = f" @ {shown['host']}" if model_obj.get('hosts', 1) > 1 else ''
+            details = f"MODEL: {shown.get('model', 'none')}{host} ({index + 1}/{len(models)})"
+            activity = self.throughput.stats(shown.get('model'))
+            # One elapsed timer for the whole set of models, not one per rotation step
+            session_key = tuple(m.get('model') for m in models)
+        elif model_obj and model_obj.get('hosts', 1) > 1:
+            details = f"{len(model_obj['models'])} models across {model_obj['hosts']} hosts"
+            session_key = details
+        version = self.ollama_version or 'unknown'
+        large_text = f"VERSION: {version}"
+        usage_model = shown.get('model') if self.rotating(model_obj) else model_obj and model_obj.get('hosts', 1) == 1 and model_name
+        if usage_model and self.week_usage and self.config.get('historyPresence', False):
+            large_text += f" | {self.format_usage(self.week_usage.get(usage_model, 0))} on {usage_model} this week"
+        ram_text = f"{self.ram_info['total_gb']}GB" if self.ram_info and self.ram_info.get('total_gb') else 'unknown'
+        card_name = self.gpu_info.get('name', 'unknown') if self.gpu_info else 'unknown'
+        vram_text = self.gpu_info.get('vram_str', 'unknown') if self.gpu_info else 'unknown'
+        gpu_brand = self.get_gpu_brand()
+        state = f"RAM: {ram_text} | VRAM: {vram_text}"
+        
+        devices = self.telemetry.snapshot() if self.telemetry else []
+        if devices:
+            used = sum(d['memory_used_mib'] or 0 for d in devices)
+            total = sum(d['memory_total_mib'] or 0 for d in devices)
+            utils = [d['utilization'] for d in devices if d['utilization'] is not None]
+            # Rounded so small fluctuations don't turn into a Discord update every poll
+            state = f"RAM: {ram_text} | VRAM: {used / 1024:.1f}/{total / 1024:.0f}GB"
+            if utils:
+                state += f" | GPU: {round(max(utils) / 5) * 5}%"
+            if len(devices) > 1:
+                card_name = f"{len(devices)}x {devices[0]['name']}"
+        
+        if activity:
+            state += self.format_activity(activity)
+        
+        return {
+            'details': details,
+            'state': state,
+            'large_image': self.config.get('largeImageKey', 'ollama'),
+            'large_text': large_text,
+            'small_image': gpu_brand,
+            'small_text': f"{card_name}",
+            'start': self.publisher.session_start_for(session_key)
+        }
+
+    @staticmethod
+    def format_activity(activity):
+        """' | 80 tok/s | 3 req/min', rounded so every new log line doesn't mean a Discord update."""
+        text = ''
+        tokens_per_sec = activity['tokens_per_sec']
+        if tokens_per_sec:
+            text += f" | {round(tokens_per_sec / 5) * 5 if tokens_per_sec >= 20 else round(tokens_per_sec)} tok/s"
+        if activity['requests_per_min']:
+            text += f" | {activity['requests_per_min']:.0f} req/min"
+        return text
+
+    @staticmethod
+    def format_usage(seconds):
+        """'12h', or '25m' under an hour; whole units so the text changes rarely."""
+        if seconds >= 3600:
+            return f"{seconds / 3600:.0f}h"
+        return f"{max(seconds // 60, 1):.0f}m"
+
+    def create_history(self, config):
+        if not config.get('history', True):
+            return None
+        return HistoryStore(DATA_DIR / 'history.db', config.get('historyFlushInterval', 60), config.get('historyRawDays', 14))
+
+    def record_history(self, model_obj):
+        """Note the loaded models in the usage history; it only goes to disk every historyFlushInterval seconds."""
+        if self.history is None:
+            return
+        models = (model_obj.get('models') or [model_obj]) if model_obj else []
+        self.history.observe(models, self.throughput_stats)
+        if self.week_usage is None or self.history.flush_due():
+            self.flush_history()
+
+    def flush_history(self):
+        try:
+            with self.metrics.timer('history'):
+                self.history.flush()
+                self.week_usage = self.history.model_seconds(week_start())
+            self.logged_state.pop('history_error', None)
+        except Exception as e:
+            self.week_usage = self.week_usage or {}
+            self.log_change('history_error', str(e), f"Failed to write usage history: {e}", logging.ERROR)
+
+    def close_history(self):
+        if self.history is None:
+            return
+        try:
+            self.history.close()
+        except Exception as e:
+            self.logger.error(f"Failed to write usage history: {e}")
+
+    def history_summary(self):
+        """Hours per model since Monday 00:00, answered from the history's indexes."""
+        since = week_start()
+        usage = self.history.model_seconds(since) if self.history else {}
+        return {
+            'since': datetime.fromtimestamp(since).isoformat(),
+            'hours': {model: round(seconds / 3600, 2) for model, seconds in sorted(usage.items(), key=lambda item: -item[1])}
+        }
+
+    def poll_log(self):
+        """Feed new Ollama server log lines into the throughput tracker."""
+        if self.log_source is None:
+            return
+        models = (self.current_model.get('models') if self.current_model else None) or []
+        # Timing lines don't name the model, so they can only be attributed while one model is loaded
+        model = models[0].get('model') if len(models) == 1 else '*'
+        lines = self.log_source.read_lines()
+        # Log timestamps are only compared with each other (the server may log in another time zone), counted
+        # back from when the file was last written, so a backlog read after a restart keeps its age
+        now = time.monotonic()
+        written = getattr(self.log_source, 'written', None)
+        end = now - max(0.0, time.time() - written) if written else now
+        events = []
+        stamp = latest = None
+        # Backwards, so timing lines get the timestamp of the gin line that follows them
+        for line in reversed(lines):
+            ts = parse_log_time(line)
+            if ts is not None:
+                stamp = ts
+                if latest is None:
+                    latest = ts
+            event = parse_log_line(line)
+            if event:
+                events.append((event, end - (latest - stamp) if stamp is not None else end))
+        for event, at in reversed(events):
+            self.throughput.record(model, event, now=at)
+        stats = self.throughput_stats = self.throughput.stats()
+        self.metrics.set('tokens_per_second', round(stats['tokens_per_sec'] or 0, 1) if stats else 0)
+
+    def rotating(self, model_obj):
+        return bool(self.rotate_interval and model_obj and len(model_obj.get('models') or ()) > 1)
+
+    def rotate_presence(self):
+        """Show the next loaded model, built from the last poll so Ollama isn't queried again."""
+        if self.rotating(self.current_model):
+            self.rotation += 1
+            self.set_presence(self.current_model)
+
+    def set_presence(self, model_obj):
+        if self.paused:
+            return
+        if not self.rpc:
+            # Remembered so it can be replayed once Discord is back
+            self.publisher.queue(self.build_presence_payload(model_obj))
+            return
+        
+        model_name = model_obj.get('model', 'none') if model_obj else 'none'
+        try:
+            payload = self.build_presence_payload(model_obj)
+            if self.publisher.publish(payload):
+                self.logger.debug(f"Rich Presence updated: {payload}")
+            elif self.publisher.pending:
+                self.logger.debug("Rich Presence update deferred by rate limit")
+            self.presence_shown(model_name)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to set presence: {e}")
+            self.metrics.inc('rpc_failures_total', call='update')
+            self.presence_active = False
+            self.handle_rpc_error(e)
+
+    def presence_shown(self, model_name):
+        """Mark the presence active once Discord has it; a deferred update waits for the flush on a later call."""
+        if self.publisher.pending is not None:
+            return
+        if not self.presence_active:
+            self.logger.info(f"Rich Presence SET: {model_name}")
+        self.presence_active = True
+
+    def clear_presence(self):
+        if not self.rpc:
+            self.publisher.reset()
+            return
+            
+        try:
+            self.publisher.clear()
+            self.presence_active = False
+            self.logger.info("Rich Presence CLEARED")
+        except Exception as e:
+            self.logger.error(f"Failed to clear presence: {e}")
+            self.metrics.inc('rpc_failures_total', call='clear')
+            self.presence_active = False
+            self.handle_rpc_error(e)
+
+    async def set_presence_async(self, model_obj):
+        if self.paused:
+            return
+        if not self.rpc:
+            self.publisher.queue(self.build_presence_payload(model_obj))
+            return
+        
+        model_name = model_obj.get('model', 'none') if model_obj else 'none'
+        try:
+            if await self.publisher.publish_async(self.build_presence_payload(model_obj)):
+                self.logger.debug(f"Rich Presence updated: {model_name}")
+            elif self.publisher.pending:
+                self.logger.debug("Rich Presence update deferred by rate limit")
+            self.presence_shown(model_name)
+        except Exception as e:
+            self.logger.error(f"Failed to set presence: {e}")
+            self.metrics.inc('rpc_failures_total', call='update')
+            self.presence_active = False
+            self.handle_rpc_error(e)
+
+    async def clear_presence_async(self):
+        if not self.rpc:
+            self.publisher.reset()
+            return
+        
+        try:
+            await self.publisher.clear_async()
+            self.logger.info("Rich Presence CLEARED")
+        except Exception as e:
+            self.logger.error(f"Failed to clear presence: {e}")
+            self.metrics.inc('rpc_failures_total', call='clear')
+            self.handle_rpc_error(e)
+        self.presence_active = False
+
+    def handle_rpc_error(self, error):
+        if is_discord_disconnect(error):
+            self.discord.lost(str(error) or type(error).__name__)
+            self.rpc = self.publisher.rpc = None
+
+    def ensure_discord(self):
+        """(Re)connect to Discord when due, then replay the last presence payload."""
+        if self.discord.check() and self.discord.connect():
+            self.rpc = self.publisher.rpc = self.discord.rpc
+            self.publisher.rearm()
+            try:
+                if self.publisher.flush():
+                    self.presence_active = True
+                    self.logger.debug("Replayed last presence after connecting")
+            except Exception as e:
+                self.logger.error(f"Failed to replay presence: {e}")
+                self.handle_rpc_error(e)
+        elif self.rpc is not self.discord.rpc:
+            # check() noticed the socket going away
+            self.rpc = self.publisher.rpc = self.discord.rpc
+            self.presence_active = False
+
+    def main_loop(self):
+        self.check_config()
+        if time.monotonic() >= self.next_memory_sample:
+            self.sample_memory()
+        with self.metrics.timer('discord'):
+            self.ensure_discord()
+        running = self.is_ollama_running()
+        if not running and self.supervise_ollama():
+            running = self.is_ollama_running()
+        
+        status_text = "RUNNING" if running else "STOPPED"
+        self.logger.debug(f"DETECTION RESULT: Ollama is {status_text}")
+        
+        if self.was_running is None:
+            self.was_running = running
+            if running:
+                self.logger.info("INITIAL STATE: Ollama already running -> Showing Rich Presence")
+                self.refresh_hardware_info()
+                self.start_telemetry()
+            else:
+                self.logger.info("INITIAL STATE: Ollama not running")
+        elif running != self.was_running:
+            if running:
+                self.logger.info("STATE CHANGE: Ollama STARTED -> Showing Rich Presence")
+                self.was_running = True
+                self.refresh_hardware_info()
+                self.start_telemetry()
+            else:
+                self.logger.info("STATE CHANGE: Ollama STOPPED -> Hiding Rich Presence")
+                self.was_running = False
+                self.current_model = None
+                self.record_history(None)
+                self.stop_telemetry()
+                self.clear_presence()
+                return
+        
+        if running:
+            if self.gpu_info is None or self.ram_info is None:
+                self.refresh_hardware_info()
+            
+            model = self.get_ollama_model()
+            self.current_model = model
+            with self.metrics.timer('log'):
+                self.poll_log()
+            self.record_history(model)
+            model_name = model.get('model', 'none') if model else None
+            self.log_change('model', model_name, f"Showing presence with model: {model_name or 'none'}")
+            self.set_presence(model)
+        else:
+            self.record_history(None)
+            if self.presence_active:
+                self.logger.info("Hiding presence - Ollama confirmed stopped")
+                self.clear_presence()
+
+    def start_telemetry(self):
+        """GPU telemetry only runs while Ollama does, and only on NVIDIA machines."""
+        if self.telemetry and self.gpu_info and self.gpu_info.get('vendor') == 'nvidia':
+            self.telemetry.start()
+
+    def stop_telemetry(self):
+        if self.telemetry:
+            self.telemetry.stop()
+
+    def poll_state(self):
+        """What the scheduler compares between ticks to decide whether anything changed."""
+        models = self.current_model.get('models') if self.current_model else None
+        if models:
+            names = tuple(m.get('model') for m in models)
+        else:
+            names = (self.current_model.get('model'),) if self.current_model else ()
+        activity = self.throughput.stats()
+        tokens_per_sec = round((activity['tokens_per_sec'] or 0) / 5) if activity else None
+        return (self.ollama_running, names, self.ollama_version, tokens_per_sec)
+
+    def auto_exit_due(self):
+        """Track how long Ollama has been stopped, returns True once the autoExitAfter deadline passes."""
+        if not self.auto_exit:
+            return False
+        if self.ollama_running:
+            self.stopped_since = None
+            return False
+        
+        now = time.monotonic()
+        if self.stopped_since is None:
+            self.stopped_since = now
+        elif now - self.stopped_since >= self.auto_exit_after:
+            self.logger.info(f"Ollama stopped for {self.auto_exit_after} seconds, exiting...")
+            return True
+        return False
+
+    def next_sleep(self):
+        interval = self.scheduler.next_interval(self.poll_state())
+        if self.auto_exit and self.stopped_since is not None:
+            # Don't oversleep the auto-exit deadline while backing off
+            remaining = self.stopped_since + self.auto_exit_after - time.monotonic()
+            interval = max(min(interval, remaining), self.scheduler.min_interval)
+        return interval
+
+    def sample_memory(self):
+        """RSS and peak RSS gauges, taken every 30 seconds; leanMode trims the heap first."""
+        self.next_memory_sample = time.monotonic() + ASYNC_PROBES['memory'][0]
+        if self.lean:
+            trim_memory()
+        rss = read_rss()
+        if rss is None:
+            return
+        self.rss_peak = max(self.rss_peak, rss)
+        self.metrics.set('rss_bytes', rss)
+        self.metrics.set('rss_peak_bytes', self.rss_peak)
+
+    def start_metrics_server(self):
+        port = self.config.get('metricsPort') or 0
+        if port:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, port)
+                self.logger.info(f"Metrics available at http://127.0.0.1:{self.metrics_server.port}/metrics")
+            except OSError as e:
+                self.logger.error(f"Failed to start metrics endpoint on port {port}: {e}")
+
+    def start_control(self):
+        """Take the single-instance lock and open the control socket, exits if another instance runs."""
+        if not self.instance.acquire():
+            pid, _ = read_pid_file(self.instance.pid_path)
+            self.logger.info(f"Another instance is already running (PID {pid}), exiting")
+            sys.exit(0)
+        self.wake_socket, self.wake_sender = socket.socketpair()
+        self.wake_socket.setblocking(False)
+        try:
+            self.control_server = ControlServer(self.handle_control, DATA_DIR)
+        except OSError as e:
+            self.logger.error(f"Failed to open control socket: {e}")
+        self.instance.write_pid(self.control_server.address if self.control_server else None)
+
+    def stop_control(self):
+        if self.control_server is not None:
+            self.control_server.close()
+            self.control_server = None
+        for sock in (self.wake_socket, self.wake_sender):
+            if sock is not None:
+                sock.close()
+        self.instance.release()
+
+    def handle_control(self, command, respond):
+        """Control socket commands. Runs on the server thread, so state changes go through call_in_loop.
+
+        status, probes and metrics only read what the loop already cached, so they
+        are safe to ask for many times a second.
+        """
+        if command == 'status':
+            respond({'ok': True, **self.status()})
+        elif command == 'probes':
+            respond({'ok': True, 'probes': self.probe_results()})
+        elif command == 'metrics':
+            respond({'ok': True, 'metrics': self.metrics.snapshot()})
+        elif command == 'history':
+            # The SQLite connection belongs to the loop's thread
+            try:
+                respond({'ok': True, **self.call_in_loop(self.history_summary).result(10)})
+            except Exception as e:
+                respond({'ok': False, 'error': f"history failed: {e}"})
+        elif command == 'refresh':
+            self.call_in_loop(self.refresh)
+            respond({'ok': True})
+        elif command in ('pause', 'resume'):
+            self.call_in_loop(lambda: self.pause_presence(command == 'pause'))
+            respond({'ok': True, 'paused': command == 'pause'})
+        elif command == 'reload':
+            try:
+                changed = self.call_in_loop(self.reload_config).result(10)
+            except Exception as e:
+                respond({'ok': False, 'error': f"reload failed: {e}"})
+                return
+            if changed is None:
+                respond({'ok': False, 'error': "config.json rejected, see the log"})
+            else:
+                respond({'ok': True, 'changed': changed})
+        elif command == 'stop':
+            # Answer first, the process may be gone right after
+            respond({'ok': True, 'pid': os.getpid()})
+            self.call_in_loop(self.request_stop)
+        else:
+            respond({'ok': False, 'error': f"unknown command: {command}"})
+
+    def call_in_loop(self, fn):
+        """Run fn on whatever owns the service state (the poll loop or the event loop), returns a Future."""
+        future = concurrent_futures.Future()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.run_call, fn, future)
+        else:
+            self.control_calls.put((fn, future))
+            try:
+                self.wake_sender.send(b'\0')
+            except OSError:
+                pass
+        return future
+
+    @staticmethod
+    def run_call(fn, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+
+    def process_control_calls(self):
+        """Run the calls queued by the control socket, True if there were any."""
+        if self.wake_socket is None:
+            return False
+        try:
+            while self.wake_socket.recv(64):
+                pass
+        except OSError:
+            pass
+        ran = False
+        while True:
+            try:
+                fn, future = self.control_calls.get_nowait()
+            except queue.Empty:
+                return ran
+            self.run_call(fn, future)
+            ran = True
+
+    def refresh(self):
+        """Run every probe now instead of at its next turn."""
+        self.scheduler.last_state = None
+        for name in self.probe_wakeups:
+            self.wake_probe(name)
+
+    def pause_presence(self, paused):
+        """Hide the presence until resumed; polling goes on so resuming shows current data at once."""
+        if paused == self.paused:
+            return
+        self.paused = paused
+        self.logger.info("Presence paused" if paused else "Presence resumed")
+        if paused:
+            if self.loop is not None:
+                asyncio.ensure_future(self.clear_presence_async())
+            else:
+                self.clear_presence()
+        else:
+            self.refresh()
+
+    def request_stop(self):
+        if self.loop is not None:
+            self.cancel_tasks()
+        else:
+            self.stop_requested = True
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'uptime': round(time.monotonic() - self.started_at, 1),
+            'async_mode': self.async_mode,
+            'lean_mode': self.lean,
+            'rss_mb': round(self.metrics.gauges.get('rss_bytes', 0) / 1048576, 1),
+            'ollama_running': self.ollama_running,
+            'model': self.current_model.get('model') if self.current_model else None,
+            'ollama_version': self.ollama_version,
+            'discord_connected': self.rpc is not None,
+            'presence_active': self.presence_active,
+            'paused': self.paused,
+            'presence': self.publisher.current
+        }
+
+    def probe_results(self):
+        """What each probe last found plus when it last ran, how long it took and how it failed."""
+        models = (self.current_model.get('models') if self.current_model else None) or []
+        results = {
+            'discord': {'connected': self.rpc is not None},
+            'liveness': {
+                'running': self.ollama_running,
+                'local': self.local_running,
+                'hosts': {e.name: e.models is not None for e in self.hosts.endpoints} if self.hosts else None
+            },
+            'model': [m.get('model') for m in models],
+            'gpu': {'gpu': self.gpu_info, 'ram': self.ram_info},
+            'version': self.ollama_version,
+            'log': self.throughput_stats
+        }
+        runs = dict(self.metrics.last_runs)
+        return {
+            name: {'result': results.get(name), **runs.get(name, {'at': None, 'seconds': None, 'error': None})}
+            for name in sorted(set(results) | set(runs))
+        }
+
+    def start_instrumentation(self):
+        """Optional metrics endpoint (metricsPort) and cProfile session (--profile)."""
+        self.start_metrics_server()
+        
+        if '--profile' in sys.argv:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            self.logger.info("Profiling enabled")
+
+    def stop_instrumentation(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            profile_path = DATA_DIR / 'profile.pstats'
+            try:
+                self.profiler.dump_stats(str(profile_path))
+                self.logger.info(f"Profile written to {profile_path}")
+            except OSError as e:
+                self.logger.error(f"Failed to write profile: {e}")
+            self.profiler = None
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+
+    def sleep(self, seconds):
+        """Wait for the next poll, stepping the presence rotation in between if it is on."""
+        deadline = time.monotonic() + seconds
+        # Wakes early if Discord starts while we're disconnected, a control command comes in or config.json changes
+        wakes = [wake for wake in (self.wake_socket, self.config_watcher.fd) if wake is not None]
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            rotating = self.rotating(self.current_model)
+            ready = self.discord.wait(min(remaining, self.rotate_interval) if rotating else remaining, wakes)
+            if self.process_control_calls() or self.stop_requested:
+                return
+            if self.config_watcher.fd is not None and self.config_watcher.fd in ready:
+                # The whole directory is watched, only a change to config.json itself ends the sleep
+                if self.config_watcher.changed():
+                    self.reload_config()
+                    return
+                continue
+            if not rotating:
+                return
+            if deadline - time.monotonic() > 0:
+                self.rotate_presence()
+
+    def signal_handler(self, signum, frame):
+        self.logger.info(f"Received signal {signum}, shutting down...")
+        if self.loop is not None:
+            # Async mode: let the probe tasks unwind and run_async do the cleanup
+            self.loop.call_soon_threadsafe(self.cancel_tasks)
+            return
+        # Sync mode: the handler may interrupt a Discord write or a history transaction,
+        # so it only ends the loop; run() tears down once the current tick is done
+        self.stop_requested = True
+        if self.wake_sender is not None:
+            try:
+                self.wake_sender.send(b'\0')
+            except OSError:
+                pass
+
+    def notify_ready(self):
+        """Under systemd: ready once the control socket is up and the first poll and presence update are done."""
+        if not self.notified_ready:
+            sd_notify(f"READY=1\nSTATUS=Ollama {'running' if self.ollama_running else 'stopped'}")
+            self.notified_ready = True
+
+    def cleanup(self):
+        sd_notify('STOPPING=1')
+        if self.presence_active:
+            self.clear_presence()
+        
+        self.discord.close()
+        self.config_watcher.close()
+        self.stop_telemetry()
+        if self.log_source:
+            self.log_source.close()
+        self.api.close()
+        if self.hosts:
+            self.hosts.close()
+        self.close_history()
+        self.stop_instrumentation()
+        self.stop_control()
+        self.logger.info("Service stopped")
+
+    def run(self):
+        self.start_control()
+        self.logger.info("Starting Ollama Discord Rich Presence Service")
+        self.logger.info(f"Auto-start Ollama: {self.auto_start and self.supervise}")
+        self.logger.info(f"Auto-exit: {self.auto_exit}")
+        self.logger.info(f"Poll interval: {self.scheduler.min_interval}-{self.scheduler.max_interval}s")
+        
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+        self.start_instrumentation()
+        self.refresh_hardware_info()
+        
+        try:
+            while not self.stop_requested:
+                self.main_loop()
+                self.notify_ready()
+                
+                # Reuses this tick's liveness result instead of probing again
+                if self.auto_exit_due():
+                    break
+                
+                self.sleep(self.next_sleep())
+                
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.cleanup()
+
+    async def probe_discord(self):
+        if self.discord.check() and await self.discord.connect_async(self.loop):
+            self.rpc = self.publisher.rpc = self.discord.rpc
+            self.publisher.rearm()
+            try:
+                if await self.publisher.flush_async():
+                    self.presence_active = True
+                    self.logger.debug("Replayed last presence after connecting")
+            except Exception as e:
+                self.logger.error(f"Failed to replay presence: {e}")
+                self.handle_rpc_error(e)
+        elif self.rpc is not self.discord.rpc:
+            self.rpc = self.publisher.rpc = self.discord.rpc
+            self.presence_active = False
+
+    async def probe_supervise(self):
+        if self.ollama_running is False:
+            # start_ollama blocks until ready, keep it off the event loop
+            if await self.loop.run_in_executor(None, self.supervise_ollama):
+                self.wake_probe('liveness')
+
+    async def probe_log(self):
+        if self.ollama_running:
+            self.poll_log()
+
+    async def probe_rotate(self):
+        if self.rotating(self.current_model):
+            self.rotation += 1
+            await self.set_presence_async(self.current_model)
+
+    async def probe_liveness(self):
+        running = self.local_running = await self.liveness.check_async()
+        if self.hosts:
+            await self.hosts.poll_async()
+            running = running or self.hosts.reachable()
+        self.ollama_running = running
+        
+        if running != self.was_running:
+            if running:
+                self.logger.info("STATE CHANGE: Ollama STARTED -> Showing Rich Presence")
+                self.start_telemetry()
+                # Pick up the model and version right away instead of waiting for their next cadence
+                self.wake_probe('version')
+                self.wake_probe('model')
+            elif self.was_running is not None:
+                self.logger.info("STATE CHANGE: Ollama STOPPED -> Hiding Rich Presence")
+                self.record_history(None)
+                self.stop_telemetry()
+                await self.clear_presence_async()
+            self.was_running = running
+        
+        if self.auto_exit_due():
+            self.cancel_tasks()
+
+    async def probe_model(self):
+        if not self.ollama_running:
+            return
+        
+        model = None
+        if self.local_running:
+            models = await self.api_async.ps()
+            self.log_api_state(models is not None)
+            if models is None:
+                result = await self.run_command_async(self.ollama_cmd)
+                model = self.parse_ollama_ps(result['stdout']) if result['ok'] and result['stdout'] else None
+            else:
+                model = {**models[0], 'models': models} if models else None
+        if self.hosts:
+            model = self.merge_host_models(model)
+        
+        self.current_model = model
+        self.record_history(model)
+        model_name = model.get('model', 'none') if model else None
+        self.log_change('model', model_name, f"Showing presence with model: {model_name or 'none'}")
+        await self.set_presence_async(model)
+
+    async def probe_gpu(self):
+        cached = self.hardware_cache.load()
+        if cached:
+            self.gpu_info = cached.get('gpu_info')
+            self.ram_info = cached.get('ram_info')
+            self.gpu_probes.prefer(cached.get('gpu_probe'))
+        else:
+            self.gpu_info = await self.get_gpu_info_async()
+            self.ram_info = self.get_ram_info()
+            self.save_hardware_cache()
+        if self.ollama_running:
+            self.start_telemetry()
+
+    async def probe_version(self):
+        if not self.ollama_running:
+            return
+        version = self.version_cache.get()
+        if version is None:
+            version = await self.api_async.version()
+            if version is None:
+                result = await self.run_command_async('ollama --version')
+                if result['ok'] and result['stdout']:
+                    version = self.parse_ollama_version(result['stdout'])
+            if version:
+                self.version_cache.save(version)
+        if version:
+            self.ollama_version = version
+
+    async def probe_config(self):
+        self.check_config()
+
+    async def probe_memory(self):
+        self.sample_memory()
+
+    def watch_discord_ipc(self):
+        if self.loop is None:
+            return
+        for watcher in self.discord.watchers:
+            self.watch_discord_dir(watcher)
+        self.discord.on_watch = self.watch_discord_dir
+
+    def watch_discord_dir(self, watcher):
+        if watcher.fd is not None:
+            # inotify fds are selectable: a new Discord socket wakes the discord probe at once
+            self.loop.add_reader(watcher.fd, self.on_discord_ipc_event)
+
+    def unwatch_discord_ipc(self):
+        if self.loop is None:
+            return
+        for watcher in self.discord.watchers:
+            if watcher.fd is not None:
+                self.loop.remove_reader(watcher.fd)
+
+    def on_discord_ipc_event(self):
+        self.discord.event_seen = self.discord.socket_changed() or self.discord.event_seen
+        if self.discord.event_seen:
+            self.wake_probe('discord')
+
+    def wake_probe(self, name):
+        event = self.probe_wakeups.get(name)
+        if event:
+            event.set()
+
+    async def probe_loop(self, name, probe, interval, timeout):
+        """Run one probe forever on its own cadence; a slow probe only delays itself.
+
+        interval None backs off with the adaptive scheduler, like the sync loop's ticks.
+        """
+        wakeup = self.probe_wakeups[name]
+        while not self.stop_requested:
+            wakeup.clear()
+            try:
+                with self.metrics.timer(name):
+                    await asyncio.wait_for(probe(), timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"{name} probe timed out after {timeout}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"{name} probe failed: {e}")
+            if name in self.ready_probes:
+                self.ready_probes.discard(name)
+                if not self.ready_probes:
+                    self.notify_ready()
+            
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.scheduler.next_interval(self.poll_state()) if interval is None else interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start_probe(self, name, probe, interval, timeout):
+        """Start (or restart with a new schedule) the task running one probe."""
+        if name in self.tasks:
+            self.tasks[name].cancel()
+        self.probe_wakeups[name] = asyncio.Event()
+        self.tasks[name] = asyncio.ensure_future(self.probe_loop(name, probe, interval, timeout))
+
+    def stop_probe(self, name):
+        task = self.tasks.pop(name, None)
+        if task:
+            task.cancel()
+        self.probe_wakeups.pop(name, None)
+
+    def schedule_optional_probes(self):
+        """supervise and rotate only run when enabled, rotate on the presenceRotate interval."""
+        if self.supervise:
+            self.start_probe('supervise', self.probe_supervise, 5, self.ollama_start_timeout + 5)
+        else:
+            self.stop_probe('supervise')
+        if self.rotate_interval:
+            self.start_probe('rotate', self.probe_rotate, self.rotate_interval, 5)
+        else:
+            self.stop_probe('rotate')
+
+    def cancel_tasks(self):
+        # wait_for before Python 3.12 can swallow a cancel that lands as the probe finishes,
+        # the flag and the wakeup still end that task instead of leaving it running for good
+        self.stop_requested = True
+        for name in self.probe_wakeups:
+            self.wake_probe(name)
+        for task in self.tasks.values():
+            task.cancel()
+
+    async def main_async(self):
+        self.loop = asyncio.get_running_loop()
+        self.api_async = AsyncOllamaApiClient(self.api.host, self.api.port, self.api.timeout, self.metrics)
+        
+        probes = {
+            'discord': self.probe_discord,
+            'liveness': self.probe_liveness,
+            'model': self.probe_model,
+            'gpu': self.probe_gpu,
+            'version': self.probe_version,
+            'log': self.probe_log,
+            'config': self.probe_config,
+            'memory': self.probe_memory
+        }
+        self.ready_probes = {'liveness', 'discord', 'model'}
+        for name, probe in probes.items():
+            self.start_probe(name, probe, *ASYNC_PROBES[name])
+        self.schedule_optional_probes()
+        self.watch_discord_ipc()
+        
+        try:
+            # Probes restarted by a config reload replace their task, keep waiting until none is left running
+            while self.tasks:
+                await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+                if all(task.done() for task in self.tasks.values()):
+                    break
+        finally:
+            sd_notify('STOPPING=1')
+            if self.presence_active:
+                await self.clear_presence_async()
+            self.unwatch_discord_ipc()
+            self.discord.close()
+            self.config_watcher.close()
+            self.stop_telemetry()
+            if self.log_source:
+                self.log_source.close()
+            self.api_async.close()
+            self.api.close()
+            if self.hosts:
+                self.hosts.close()
+            self.close_history()
+            self.stop_instrumentation()
+            self.stop_control()
+            self.logger.info("Service stopped")
+
+    def run_async(self):
+        """Like run(), but every probe is an asyncio task with its own interval and timeout."""
+        self.start_control()
+        self.logger.info("Starting Ollama Discord Rich Presence Service (async mode)")
+        self.logger.info(f"Auto-start Ollama: {self.auto_start and self.supervise}")
+        self.logger.info(f"Auto-exit: {self.auto_exit}")
+        
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+        self.start_instrumentation()
+        
+        asyncio.run(self.main_async())
+
+def main():
+    for command in CONTROL_COMMANDS:
+        if f"--{command}" in sys.argv:
+            return control_main(command)
+    service = OllamaDiscordService()
+    if service.async_mode:
+        service.run_async()
+    else:
+        service.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
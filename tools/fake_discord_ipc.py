@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Discord IPC stand-in
+Listens on a discord-ipc-N Unix socket and answers the handshake and
+SET_ACTIVITY frames pypresence sends, so the presence service can connect,
+lose Discord and reconnect without the Discord client running.
+
+    XDG_RUNTIME_DIR=/tmp/fake-discord python tools/fake_discord_ipc.py
+    XDG_RUNTIME_DIR=/tmp/fake-discord python ollama_presence.py
+
+Unix only; Discord uses named pipes on Windows.
+"""
+
+import os
+import sys
+import json
+import socket
+import struct
+import argparse
+import threading
+import socketserver
+
+OP_HANDSHAKE = 0
+OP_FRAME = 1
+OP_CLOSE = 2
+OP_PING = 3
+OP_PONG = 4
+
+HEADER = struct.Struct("<II")
+
+class FakeDiscordIpcServer:
+    """Threaded Unix socket server speaking enough of Discord's RPC protocol for pypresence.
+
+    stop() drops every client and removes the socket like a quitting Discord;
+    start() again brings it back at the same path.
+    """
+
+    def __init__(self, directory, pipe=0):
+        self.path = os.path.join(str(directory), f"discord-ipc-{pipe}")
+        self.activities = []
+        self.handshakes = 0
+        self.server = None
+        self.clients = set()
+        self.lock = threading.Lock()
+
+    @property
+    def activity(self):
+        """Activity Discord would currently show, None if cleared."""
+        with self.lock:
+            return self.activities[-1] if self.activities else None
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with fake.lock:
+                    fake.clients.add(self.request)
+                try:
+                    while True:
+                        header = self.read_exactly(HEADER.size)
+                        if header is None:
+                            return
+                        op, length = HEADER.unpack(header)
+                        body = self.read_exactly(length)
+                        if body is None:
+                            return
+                        message = json.loads(body.decode("utf-8"))
+                        if op == OP_HANDSHAKE:
+                            with fake.lock:
+                                fake.handshakes += 1
+                            self.send(OP_FRAME, {
+                                "cmd": "DISPATCH",
+                                "evt": "READY",
+                                "nonce": None,
+                                "data": {"v": 1, "user": {"id": "0", "username": "fake"}}
+                            })
+                        elif op == OP_FRAME:
+                            self.frame(message)
+                        elif op == OP_PING:
+                            self.send(OP_PONG, message)
+                        elif op == OP_CLOSE:
+                            return
+                except OSError:
+                    pass
+                finally:
+                    with fake.lock:
+                        fake.clients.discard(self.request)
+
+            def frame(self, message):
+                args = message.get("args", {})
+                if message.get("cmd") == "SET_ACTIVITY":
+                    with fake.lock:
+                        fake.activities.append(args.get("activity"))
+                self.send(OP_FRAME, {
+                    "cmd": message.get("cmd"),
+                    "evt": None,
+                    "nonce": message.get("nonce"),
+                    "data": args.get("activity")
+                })
+
+            def read_exactly(self, size):
+                data = b""
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        return None
+                    data += chunk
+                return data
+
+            def send(self, op, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.request.sendall(HEADER.pack(op, len(body)) + body)
+
+        return Handler
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = socketserver.ThreadingUnixStreamServer(self.path, self._make_handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+                client.close()
+            except OSError:
+                pass
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Discord IPC server")
+    parser.add_argument("--dir", default=os.environ.get("XDG_RUNTIME_DIR"), help="socket directory (default $XDG_RUNTIME_DIR)")
+    parser.add_argument("--pipe", type=int, default=0)
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir or XDG_RUNTIME_DIR is required")
+
+    server = FakeDiscordIpcServer(args.dir, args.pipe).start()
+    print(f"Fake Discord listening on {server.path}")
+    seen = 0
+    try:
+        event = threading.Event()
+        while not event.wait(0.5):
+            with server.lock:
+                new, seen = server.activities[seen:], len(server.activities)
+            for activity in new:
+                print(json.dumps(activity))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
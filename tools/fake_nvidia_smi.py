@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+nvidia-smi stand-in
+Answers --query-gpu queries (one-shot or --loop-ms streaming) for a set of
+made-up GPUs so GPU telemetry can be exercised on machines without one.
+Point the service at it with:
+
+    "nvidiaSmi": "python tools/fake_nvidia_smi.py"
+
+FAKE_NVIDIA_SMI_GPUS   comma separated name:vram_mib list
+                       (default "NVIDIA GeForce RTX 4090:24564,NVIDIA GeForce RTX 3060:12288")
+FAKE_NVIDIA_SMI_LOG    if set, one line is appended to this file per invocation
+"""
+
+import os
+import sys
+import time
+import random
+
+DEFAULT_GPUS = "NVIDIA GeForce RTX 4090:24564,NVIDIA GeForce RTX 3060:12288"
+
+def load_gpus():
+    gpus = []
+    for index, spec in enumerate(os.environ.get("FAKE_NVIDIA_SMI_GPUS", DEFAULT_GPUS).split(",")):
+        name, _, vram = spec.strip().rpartition(":")
+        if not name:
+            name, vram = vram, "8192"
+        gpus.append({
+            "index": index,
+            "name": name,
+            "memory.total": int(vram),
+            "memory.used": int(vram) // 4,
+            "utilization.gpu": 0,
+            "temperature.gpu": 40,
+            "driver_version": "550.00"
+        })
+    return gpus
+
+def step(gpu):
+    """Random walk so streamed samples change like a busy card would."""
+    total = gpu["memory.total"]
+    gpu["memory.used"] = max(0, min(total, gpu["memory.used"] + random.randint(-256, 256)))
+    gpu["utilization.gpu"] = max(0, min(100, gpu["utilization.gpu"] + random.randint(-20, 20)))
+    gpu["temperature.gpu"] = max(30, min(90, gpu["temperature.gpu"] + random.randint(-2, 2)))
+
+def format_row(gpu, fields):
+    values = []
+    for field in fields:
+        if field == "memory.free":
+            values.append(str(gpu["memory.total"] - gpu["memory.used"]))
+        else:
+            values.append(str(gpu.get(field, "[N/A]")))
+    return ", ".join(values)
+
+def main(argv):
+    log_path = os.environ.get("FAKE_NVIDIA_SMI_LOG")
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(" ".join(argv) + "\n")
+
+    fields = None
+    loop_ms = None
+    for arg in argv:
+        if arg.startswith("--query-gpu="):
+            fields = [f.strip() for f in arg.split("=", 1)[1].split(",")]
+        elif arg.startswith("--loop-ms="):
+            loop_ms = int(arg.split("=", 1)[1])
+
+    if fields is None:
+        print("fake nvidia-smi: only --query-gpu is supported", file=sys.stderr)
+        return 1
+
+    gpus = load_gpus()
+    try:
+        while True:
+            for gpu in gpus:
+                print(format_row(gpu, fields))
+            sys.stdout.flush()
+            if loop_ms is None:
+                return 0
+            time.sleep(loop_ms / 1000)
+            for gpu in gpus:
+                step(gpu)
+    except (KeyboardInterrupt, BrokenPipeError):
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
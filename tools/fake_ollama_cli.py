@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+ollama CLI stand-in
+Understands the subcommands the presence service runs:
+
+    python tools/fake_ollama_cli.py ps          # `ollama ps` table
+    python tools/fake_ollama_cli.py --version   # `ollama --version`
+    python tools/fake_ollama_cli.py serve       # fake API server on OLLAMA_HOST
+
+FAKE_OLLAMA_MODELS   comma separated loaded model names (default "llama3:8b")
+FAKE_OLLAMA_VERSION  reported version (default "0.0.0-fake")
+FAKE_OLLAMA_LOG      if set, one line is appended to this file per invocation
+"""
+
+import os
+import sys
+import hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def loaded_models():
+    names = os.environ.get("FAKE_OLLAMA_MODELS", "llama3:8b")
+    return [name.strip() for name in names.split(",") if name.strip()]
+
+def ps():
+    rows = [("NAME", "ID", "SIZE", "PROCESSOR", "UNTIL")]
+    for name in loaded_models():
+        rows.append((name, hashlib.sha256(name.encode("utf-8")).hexdigest()[:12], "5.4 GB", "100% GPU", "4 minutes from now"))
+    widths = [max(len(row[i]) for row in rows) + 4 for i in range(len(rows[0]))]
+    for row in rows:
+        print("".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    return 0
+
+def serve():
+    from fake_ollama_server import FakeOllamaServer, make_model
+
+    host = os.environ.get("OLLAMA_HOST", "127.0.0.1:11434").split("://")[-1]
+    address, _, port = host.rpartition(":")
+    server = FakeOllamaServer(
+        [make_model(name) for name in loaded_models()],
+        os.environ.get("FAKE_OLLAMA_VERSION", "0.0.0-fake"),
+        address or "127.0.0.1",
+        int(port or 11434)
+    )
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def main(argv):
+    log_path = os.environ.get("FAKE_OLLAMA_LOG")
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(" ".join(argv) + "\n")
+
+    if not argv:
+        print("Usage: ollama [command]", file=sys.stderr)
+        return 1
+    if argv[0] in ("--version", "-v"):
+        print(f"ollama version is {os.environ.get('FAKE_OLLAMA_VERSION', '0.0.0-fake')}")
+        return 0
+    if argv[0] == "ps":
+        return ps()
+    if argv[0] == "serve":
+        return serve()
+    print(f"Error: unknown command \"{argv[0]}\" for \"ollama\"", file=sys.stderr)
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
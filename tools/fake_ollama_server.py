@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Ollama API stand-in
+Serves /api/ps, /api/version and /api/tags like a local Ollama server so the
+presence service can be run and tested without Ollama installed.
+
+    python tools/fake_ollama_server.py --port 11434 --model llama3:8b --model qwen2:7b
+"""
+
+import json
+import sys
+import socket
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GIB = 1024 * 1024 * 1024
+
+def make_model(name, size=5 * GIB, size_vram=None, expires_in=300):
+    """Build a /api/ps entry, size_vram defaults to fully offloaded."""
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+    return {
+        "name": name,
+        "model": name,
+        "size": size,
+        "digest": hashlib.sha256(name.encode("utf-8")).hexdigest(),
+        "details": {"format": "gguf", "family": name.split(':')[0]},
+        "expires_at": expires_at.isoformat(),
+        "size_vram": size if size_vram is None else size_vram
+    }
+
+class FakeOllamaServer:
+    """Threaded HTTP server speaking the parts of the Ollama API the service uses."""
+
+    def __init__(self, models=None, version="0.0.0-fake", host="127.0.0.1", port=0):
+        self.models = list(models or [])
+        self.version = version
+        self.requests = 0
+        self.connections = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out as separate writes; without this Nagle + delayed ACK add ~40ms per request
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                server.connections += 1
+
+            def do_GET(self):
+                server.requests += 1
+                if self.path == "/api/ps":
+                    self.send_json({"models": server.models})
+                elif self.path == "/api/tags":
+                    self.send_json({"models": server.models})
+                elif self.path == "/api/version":
+                    self.send_json({"version": server.version})
+                elif self.path == "/":
+                    self.send_body(b"Ollama is running", "text/plain")
+                else:
+                    self.send_json({"error": "not found"}, status=404)
+
+            def send_json(self, data, status=200):
+                self.send_body(json.dumps(data).encode("utf-8"), "application/json", status)
+
+            def send_body(self, body, content_type, status=200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", action="append", default=[], help="loaded model name (repeatable)")
+    parser.add_argument("--version", default="0.0.0-fake")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer([make_model(name) for name in args.model], args.version, args.host, args.port)
+    print(f"Fake Ollama listening on {args.host}:{server.port}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,17 +12,60 @@ import psutil
 from pathlib import Path
 import shutil
 
+try:
+    # Next to this script in installer layouts; without it only the process scan is left
+    import ollama_presence
+except ImportError:
+    ollama_presence = None
+
+# The script and the `ollama-presence` entry point of a package install
+SERVICE_NAMES = ('ollama_presence', 'ollama-presence')
+
+def stop_recorded_service():
+    """Stop the service named in service.pid, True if it was running and is gone now."""
+    if ollama_presence is None:
+        return False
+    pid, address = ollama_presence.read_pid_file()
+    if pid is None:
+        return False
+    try:
+        proc = psutil.Process(pid)
+        # A stale PID file may name an unrelated process that reused the PID
+        if not any(name in part for part in proc.cmdline() for name in SERVICE_NAMES):
+            return False
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+    
+    reply = ollama_presence.control_request(address, "stop") if address else None
+    try:
+        if reply and reply.get("ok"):
+            print(f"  Stopping process: {pid}")
+            proc.wait(10)
+        else:
+            print(f"  Killing process: {pid}")
+            proc.kill()
+    except psutil.TimeoutExpired:
+        print(f"  Killing process: {pid}")
+        proc.kill()
+    except psutil.NoSuchProcess:
+        pass
+    return True
+
 def kill_ollama_presence():
-    """Kill any running ollama_presence processes."""
+    """Stop the running service, scanning the process list only for copies that predate the PID file."""
     print("🔄 Stopping Ollama Discord Rich Presence...")
     
+    if stop_recorded_service():
+        print("✅ Stopped the running service")
+        return
+    
     killed = 0
     for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
         try:
             # Check if it's our process
             if proc.info['cmdline']:
                 cmdline_str = ' '.join(proc.info['cmdline'])
-                if 'ollama_presence.py' in cmdline_str or 'ollama_discord_service' in cmdline_str:
+                if any(name in cmdline_str for name in SERVICE_NAMES) or 'ollama_discord_service' in cmdline_str:
                     print(f"  Killing process: {proc.info['pid']}")
                     proc.kill()
                     killed += 1
@@ -60,28 +103,27 @@ def remove_windows_service():
                 print(f"  ❌ Failed to remove {file}: {e}")
 
 def remove_linux_service():
-    """Remove Linux systemd service."""
-    print("🔧 Removing Linux systemd service...")
+    """Remove the systemd user units the installer creates."""
+    print("🔧 Removing systemd user service...")
+    
+    units = ["ollama-discord.path", "ollama-discord.service"]
+    unit_dir = Path.home() / ".config/systemd/user"
+    if not any((unit_dir / unit).exists() for unit in units):
+        print("  ℹ️  No systemd user service found")
+        return
     
     try:
-        # Stop and disable service
-        subprocess.run(["sudo", "systemctl", "stop", "ollama-discord.service"], 
-                      capture_output=True)
-        subprocess.run(["sudo", "systemctl", "disable", "ollama-discord.service"], 
-                      capture_output=True)
-        
-        # Remove service file
-        service_file = Path("/etc/systemd/system/ollama-discord.service")
-        if service_file.exists():
-            subprocess.run(["sudo", "rm", str(service_file)], capture_output=True)
-            subprocess.run(["sudo", "systemctl", "daemon-reload"], capture_output=True)
-            print("  ✅ Removed systemd service")
+        # The path unit goes first, otherwise it would start the service again while Ollama runs
+        for unit in units:
+            subprocess.run(["systemctl", "--user", "disable", "--now", unit], 
+                          capture_output=True)
         
-        # Remove local service file
-        local_service = Path.cwd() / "ollama-discord.service"
-        if local_service.exists():
-            local_service.unlink()
-            print("  ✅ Removed local service file")
+        for unit in units:
+            unit_file = unit_dir / unit
+            if unit_file.exists():
+                unit_file.unlink()
+                print(f"  ✅ Removed {unit}")
+        subprocess.run(["systemctl", "--user", "daemon-reload"], capture_output=True)
             
     except Exception as e:
         print(f"  ❌ Error removing systemd service: {e}")
@@ -167,15 +209,17 @@ def main():
     
     print()
     
+    # Under systemd the unit has to go before the process, or it would be started again
+    system = platform.system()
+    if system == "Linux":
+        remove_linux_service()
+    
     # Kill running processes
     kill_ollama_presence()
     
     # Remove platform-specific services
-    system = platform.system()
     if system == "Windows":
         remove_windows_service()
-    elif system == "Linux":
-        remove_linux_service()
     elif system == "Darwin":
         remove_macos_service()
     